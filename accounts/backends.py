@@ -0,0 +1,58 @@
+import time
+
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from .models import User
+
+USER_VERSION_KEY = 'auth_user_version:{}'
+USER_KEY = 'auth_user:{}:{}'
+
+# 缓存的用户字段（按模型字段顺序）
+CACHED_FIELDS = ['id', 'is_superuser', 'username', 'role', 'is_active', 'is_staff']
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    与 ModelBackend 相同，但每个请求加载 request.user 时先查共享缓存。
+
+    缓存中只保存权限判断所需的少量字段（CACHED_FIELDS）和会话校验值，不保存密码哈希；
+    取出后构造只加载了这些字段的 User，其余字段按需延迟加载。缓存键包含该用户的版本号，
+    User 保存或删除后版本号递增（见 accounts.signals），旧缓存不再命中；
+    即使并发请求在递增前读到旧数据，也只会写入旧版本的键。
+    """
+
+    def get_user(self, user_id):
+        version = user_version(user_id)
+        key = USER_KEY.format(user_id, version)
+        record = cache.get(key)
+        if record is None:
+            try:
+                user = User._default_manager.get(pk=user_id)
+            except User.DoesNotExist:
+                return None
+            record = {field: getattr(user, field) for field in CACHED_FIELDS}
+            record['session_auth_hash'] = user.get_session_auth_hash()
+            cache.set(key, record)
+        else:
+            user = User.from_db('default', CACHED_FIELDS, [record[field] for field in CACHED_FIELDS])
+            user.cached_session_auth_hash = record['session_auth_hash']
+        return user if self.user_can_authenticate(user) else None
+
+
+def user_version(user_id):
+    key = USER_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        # 以时间作为初始值：版本号被淘汰后重新初始化，也不会与旧缓存的版本相同
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_user(user_id):
+    key = USER_VERSION_KEY.format(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
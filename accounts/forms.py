@@ -1,7 +1,10 @@
+import math
+
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from django.contrib.auth import authenticate
 from .models import User, TeacherInfo, AdminInfo
+from . import throttle
 
 class CustomAuthenticationForm(AuthenticationForm):
     """自定义登录表单"""
@@ -19,11 +22,18 @@ class CustomAuthenticationForm(AuthenticationForm):
         password = self.cleaned_data.get('password')
         
         if username and password:
+            # 在计算密码哈希之前检查失败次数，超限的尝试直接拒绝
+            wait = throttle.retry_after(self.request, username)
+            if wait:
+                raise forms.ValidationError(f'登录失败次数过多，请{math.ceil(wait / 60)}分钟后再试')
+            
             self.user_cache = authenticate(self.request, username=username, password=password)
             if self.user_cache is None:
+                throttle.record_failure(self.request, username)
                 raise forms.ValidationError('用户名或密码错误')
             elif not self.user_cache.is_active:
                 raise forms.ValidationError('账号已被禁用')
+            throttle.reset(self.request, username)
         return self.cleaned_data
 
 class TeacherRegistrationForm(UserCreationForm):
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from accounts import throttle
+
+
+class Command(BaseCommand):
+    help = '查看登录限流的累计统计：失败次数、被拒绝的尝试次数、锁定次数'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='输出后清零统计')
+
+    def handle(self, *args, **options):
+        values = throttle.metrics()
+        self.stdout.write(f'登录失败：{values["failures"]} 次')
+        self.stdout.write(f'限流拒绝（未校验密码）：{values["blocked"]} 次')
+        self.stdout.write(f'触发锁定：{values["lockouts"]} 次')
+        if options['reset']:
+            throttle.reset_metrics()
+            self.stdout.write(self.style.SUCCESS('统计已清零'))
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils import timezone
 
@@ -43,6 +43,21 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.username
     
+    def save(self, *args, **kwargs):
+        # 与 post_save 信号中的统计计数更新处于同一事务
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
+    def set_password(self, raw_password):
+        super().set_password(raw_password)
+        # 缓存的会话校验值对应旧密码，之后按新密码重新计算
+        self.cached_session_auth_hash = None
+    
+    def get_session_auth_hash(self):
+        # 从缓存构造的用户（见 accounts.backends）不含密码字段，使用缓存的会话校验值
+        cached = getattr(self, 'cached_session_auth_hash', None)
+        return cached or super().get_session_auth_hash()
+    
     @property
     def is_super_admin(self):
         return self.role == 'super_admin'
@@ -1,3 +1,152 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.conf import settings
+from django.contrib.auth import update_session_auth_hash
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from . import throttle
+from .backends import USER_KEY, CachedModelBackend, user_version
+from .models import User
+
+TEST_SETTINGS = {
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    'OPERATION_LOG_ASYNC': False,
+}
+
+
+@override_settings(**TEST_SETTINGS)
+class CachedUserTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('boss', 'pw', role='super_admin')
+        self.client.force_login(self.admin)
+
+    def user_queries(self, url='/accounts/admin/teachers/'):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [query['sql'] for query in queries if 'accounts_user' in query['sql']]
+
+    def test_second_request_does_not_query_user(self):
+        self.client.get('/accounts/admin/teachers/')
+        response, queries = self.user_queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+
+    def test_password_hash_not_cached(self):
+        self.client.get('/accounts/admin/teachers/')
+        record = cache.get(USER_KEY.format(self.admin.pk, user_version(self.admin.pk)))
+        self.assertEqual(record['role'], 'super_admin')
+        self.assertNotIn('password', record)
+        self.assertNotIn(self.admin.password, record.values())
+
+    def test_role_change_invalidates(self):
+        self.client.get('/accounts/admin/teachers/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.role = 'teacher'
+            self.admin.save()
+        self.assertEqual(self.client.get('/accounts/admin/teachers/').status_code, 403)
+
+    def test_password_change_logs_out(self):
+        self.client.get('/accounts/admin/teachers/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.set_password('new')
+            self.admin.save()
+        response = self.client.get('/accounts/admin/teachers/')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/accounts/login/', response['Location'])
+
+    def test_password_change_keeps_current_session(self):
+        self.client.get('/accounts/admin/teachers/')
+        # 修改密码的视图拿到的是从缓存构造的 request.user
+        user = CachedModelBackend().get_user(self.admin.pk)
+        self.assertIsNotNone(user.cached_session_auth_hash)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.set_password('new')
+            user.save()
+        request = RequestFactory().get('/')
+        request.session, request.user = self.client.session, user
+        update_session_auth_hash(request, user)
+        request.session.save()
+        # update_session_auth_hash 会更换会话键
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = request.session.session_key
+
+        self.assertEqual(self.client.get('/accounts/admin/teachers/').status_code, 200)
+        self.assertTrue(User.objects.get(pk=self.admin.pk).check_password('new'))
+
+    def test_inactive_user_rejected(self):
+        self.client.get('/accounts/admin/teachers/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.is_active = False
+            self.admin.save()
+        self.assertEqual(self.client.get('/accounts/admin/teachers/').status_code, 302)
+
+
+@override_settings(**TEST_SETTINGS, LOGIN_FAILURE_LIMIT=3, LOGIN_FAILURE_IP_LIMIT=5, LOGIN_FAILURE_COOLOFF_TIME=600)
+class LoginThrottleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().post('/accounts/login/', REMOTE_ADDR='10.0.0.1')
+        # 固定在窗口开始处，上一个桶的权重为1
+        patcher = mock.patch.object(throttle.time, 'time', return_value=6000.0)
+        self.clock = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(throttle, 'logger')
+        self.logger = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fail(self, username, times=1, request=None):
+        for _ in range(times):
+            throttle.record_failure(request or self.request, username)
+
+    def test_blocks_after_limit(self):
+        self.fail('alice', 2)
+        self.assertEqual(throttle.retry_after(self.request, 'alice'), 0)
+        self.fail('alice')
+        self.assertGreater(throttle.retry_after(self.request, 'alice'), 0)
+        # 用户名不区分大小写和首尾空格
+        self.assertGreater(throttle.retry_after(self.request, ' Alice '), 0)
+        self.assertEqual(throttle.retry_after(self.request, 'bob'), 0)
+        self.assertEqual(throttle.metrics(), {'failures': 3, 'blocked': 2, 'lockouts': 1})
+        self.logger.warning.assert_called_once()
+
+    def test_unblocks_as_window_slides(self):
+        self.fail('alice', 3)
+        wait = throttle.retry_after(self.request, 'alice')
+        self.clock.return_value = 6000.0 + wait - 1
+        self.assertGreater(throttle.retry_after(self.request, 'alice'), 0)
+        self.clock.return_value = 6000.0 + wait
+        self.assertEqual(throttle.retry_after(self.request, 'alice'), 0)
+
+    def test_reset_clears_username_but_not_ip(self):
+        self.fail('alice', 3)
+        throttle.reset(self.request, 'alice')
+        self.assertEqual(throttle.retry_after(self.request, 'alice'), 0)
+        # 同一IP的失败次数（5次）已达上限
+        self.fail('bob', 2)
+        self.assertGreater(throttle.retry_after(self.request, 'carol'), 0)
+        other_ip = RequestFactory().post('/accounts/login/', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(throttle.retry_after(other_ip, 'carol'), 0)
+
+    def test_login_view_rejects_before_checking_password(self):
+        User.objects.create_user('alice', 'pw', role='teacher')
+        for _ in range(3):
+            self.client.post('/accounts/login/', {'username': 'alice', 'password': 'wrong'})
+        with mock.patch('accounts.forms.authenticate') as authenticate:
+            response = self.client.post('/accounts/login/', {'username': 'alice', 'password': 'pw'})
+        authenticate.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '登录失败次数过多')
+
+    def test_stats_command(self):
+        self.fail('alice', 3)
+        output = StringIO()
+        call_command('login_throttle_stats', '--reset', stdout=output)
+        self.assertIn('登录失败：3 次', output.getvalue())
+        self.assertEqual(throttle.metrics(), {'failures': 0, 'blocked': 0, 'lockouts': 0})
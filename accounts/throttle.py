@@ -0,0 +1,116 @@
+import hashlib
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# 失败计数按时间窗口分桶：当前桶 + 上一个桶按剩余比例加权，近似滑动窗口
+BUCKET_KEY = 'login_fail:{}:{}:{}'
+METRIC_KEY = 'login_throttle:{}'
+METRICS = ('failures', 'blocked', 'lockouts')
+
+
+def _window():
+    return getattr(settings, 'LOGIN_FAILURE_COOLOFF_TIME', 15 * 60)
+
+
+def _limits(request, username):
+    """[(计数范围, 标识, 上限)]：同一用户名、同一IP分别计数"""
+    limits = [('user', hashlib.md5(username.strip().lower().encode()).hexdigest(),
+               getattr(settings, 'LOGIN_FAILURE_LIMIT', 5))]
+    ip_address = request.META.get('REMOTE_ADDR') if request is not None else None
+    if ip_address:
+        limits.append(('ip', ip_address, getattr(settings, 'LOGIN_FAILURE_IP_LIMIT', 20)))
+    return limits
+
+
+def _counts(limits, now):
+    """各范围当前桶和上一个桶的失败次数（一次 get_many），以及上一个桶的权重"""
+    window = _window()
+    bucket = int(now // window)
+    keys = {
+        (scope, ident): (BUCKET_KEY.format(scope, ident, bucket), BUCKET_KEY.format(scope, ident, bucket - 1))
+        for scope, ident, _ in limits
+    }
+    values = cache.get_many([key for pair in keys.values() for key in pair])
+    counts = {
+        scope_ident: (values.get(current, 0), values.get(previous, 0))
+        for scope_ident, (current, previous) in keys.items()
+    }
+    return counts, 1 - (now % window) / window
+
+
+def retry_after(request, username):
+    """
+    在校验密码之前调用：该用户名或IP在窗口内的失败次数已达上限时返回需等待的秒数，否则返回0。
+
+    只读取缓存，被拒绝的尝试不计算密码哈希。
+    """
+    now = time.time()
+    window = _window()
+    limits = _limits(request, username)
+    counts, weight = _counts(limits, now)
+    wait = 0
+    for scope, ident, limit in limits:
+        current, previous = counts[(scope, ident)]
+        if current + previous * weight < limit:
+            continue
+        if current >= limit:
+            # 当前桶已满：进入下一个窗口后，其权重降到 limit/current 以下才解除
+            seconds = window * weight + window * (1 - limit / current)
+        else:
+            # 上一个桶的权重降到 (limit-current)/previous 以下即解除
+            seconds = window * (weight - (limit - current) / previous)
+        wait = max(wait, math.ceil(seconds) + 1)
+    if wait:
+        _incr_metric('blocked')
+    return wait
+
+
+def record_failure(request, username):
+    """记录一次登录失败；达到上限时计一次锁定"""
+    now = time.time()
+    window = _window()
+    bucket = int(now // window)
+    limits = _limits(request, username)
+    for scope, ident, _ in limits:
+        key = BUCKET_KEY.format(scope, ident, bucket)
+        # 两个窗口后自然过期
+        cache.add(key, 0, timeout=window * 2)
+        cache.incr(key)
+    _incr_metric('failures')
+
+    counts, weight = _counts(limits, now)
+    for scope, ident, limit in limits:
+        current, previous = counts[(scope, ident)]
+        count = current + previous * weight
+        if count - 1 < limit <= count:
+            _incr_metric('lockouts')
+            logger.warning('登录失败次数达到上限，暂时锁定：%s %s', scope, ident)
+
+
+def reset(request, username):
+    """登录成功后清除该用户名的失败计数（IP计数保留）"""
+    bucket = int(time.time() // _window())
+    ident = _limits(request, username)[0][1]
+    cache.delete_many([BUCKET_KEY.format('user', ident, bucket), BUCKET_KEY.format('user', ident, bucket - 1)])
+
+
+def metrics():
+    """累计的登录失败次数、被拒绝的尝试次数和锁定次数"""
+    values = cache.get_many([METRIC_KEY.format(name) for name in METRICS])
+    return {name: values.get(METRIC_KEY.format(name), 0) for name in METRICS}
+
+
+def reset_metrics():
+    cache.delete_many([METRIC_KEY.format(name) for name in METRICS])
+
+
+def _incr_metric(name):
+    key = METRIC_KEY.format(name)
+    cache.add(key, 0, timeout=None)
+    cache.incr(key)
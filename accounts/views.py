@@ -3,13 +3,12 @@ from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import HttpResponseForbidden
-from django.db.models import Sum, Count
+from django.db.models import Count
 from .forms import CustomAuthenticationForm, TeacherRegistrationForm, TeacherInfoForm, AdminInfoForm, AdminRegistrationForm
 from .models import User, TeacherInfo, AdminInfo
 from orders.models import OperationLog
 import datetime
-from django.views.decorators.cache import cache_page
-from django.views.decorators.vary import vary_on_cookie, vary_on_headers
+from class_os.view_cache import cached_view_data
 
 # 权限检查装饰器
 def role_required(allowed_roles):
@@ -34,14 +33,12 @@ def login_view(request):
             login(request, user)
             
             # 记录登录日志
-            OperationLog.objects.create(
+            OperationLog.record(
                 user=user,
                 action='login',
                 object_type='User',
                 object_id=user.id,
-                object_name=user.username,
-                ip_address=request.META.get('REMOTE_ADDR'),
-                description=f'用户{user.username}登录系统'
+                ip_address=request.META.get('REMOTE_ADDR')
             )
             
             messages.success(request, '登录成功')
@@ -55,14 +52,12 @@ def login_view(request):
 @login_required
 def logout_view(request):
     # 记录登出日志
-    OperationLog.objects.create(
+    OperationLog.record(
         user=request.user,
         action='logout',
         object_type='User',
         object_id=request.user.id,
-        object_name=request.user.username,
-        ip_address=request.META.get('REMOTE_ADDR'),
-        description=f'用户{request.user.username}登出系统'
+        ip_address=request.META.get('REMOTE_ADDR')
     )
     
     logout(request)
@@ -123,14 +118,12 @@ def admin_register(request):
             )
             
             # 记录操作日志
-            OperationLog.objects.create(
+            OperationLog.record(
                 user=request.user,
                 action='create',
                 object_type='Admin',
                 object_id=user.id,
-                object_name=user.username,
-                ip_address=request.META.get('REMOTE_ADDR'),
-                description=f'超级管理员{request.user.username}创建了普通管理员{user.username}'
+                ip_address=request.META.get('REMOTE_ADDR')
             )
             
             messages.success(request, '普通管理员账号创建成功！')
@@ -152,7 +145,7 @@ def admin_list(request):
     is_active = request.GET.get('is_active', '')
     
     # 构建查询 - 只显示普通管理员，不显示超级管理员
-    admins = User.objects.filter(role='admin')
+    admins = User.objects.select_related('admin_info').filter(role='admin')
     
     if search:
         admins = admins.filter(
@@ -225,14 +218,12 @@ def admin_edit(request, pk):
             admin.save()
             
             # 记录操作日志
-            OperationLog.objects.create(
+            OperationLog.record(
                 user=request.user,
                 action='update',
                 object_type='Admin',
                 object_id=admin.id,
-                object_name=admin.username,
-                ip_address=request.META.get('REMOTE_ADDR'),
-                description=f'超级管理员{request.user.username}编辑了管理员{admin.username}的信息'
+                ip_address=request.META.get('REMOTE_ADDR')
             )
             
             messages.success(request, '管理员信息已更新！')
@@ -266,14 +257,12 @@ def admin_toggle(request, pk):
     
     # 记录操作日志
     action = 'enable' if admin.is_active else 'disable'
-    OperationLog.objects.create(
+    OperationLog.record(
         user=request.user,
         action=action,
         object_type='Admin',
         object_id=admin.id,
-        object_name=admin.username,
-        ip_address=request.META.get('REMOTE_ADDR'),
-        description=f'超级管理员{request.user.username} {'启用' if admin.is_active else '禁用'}了管理员{admin.username}的账号'
+        ip_address=request.META.get('REMOTE_ADDR')
     )
     
     messages.success(request, f'管理员账号已{'启用' if admin.is_active else '禁用'}！')
@@ -293,14 +282,13 @@ def admin_delete(request, pk):
         return redirect('accounts:admin_list')
     
     # 记录操作日志
-    OperationLog.objects.create(
+    OperationLog.record(
         user=request.user,
         action='delete',
         object_type='Admin',
         object_id=admin.id,
-        object_name=admin.username,
-        ip_address=request.META.get('REMOTE_ADDR'),
-        description=f'超级管理员{request.user.username}删除了管理员{admin.username}的账号'
+        params={'name': admin.username},
+        ip_address=request.META.get('REMOTE_ADDR')
     )
     
     # 删除管理员账号（级联删除会自动删除关联的AdminInfo）
@@ -314,19 +302,18 @@ def admin_delete(request, pk):
 def dashboard(request):
     if request.user.is_admin:
         # 管理员仪表盘
-        from orders.models import Order, SalaryApplication
-        # 使用annotate优化查询
-        total_teachers = User.objects.filter(role='teacher').count()
-        total_orders = Order.objects.count()
-        pending_applications = SalaryApplication.objects.filter(status='pending').count()
-        approved_amount = SalaryApplication.objects.filter(status='approved').aggregate(
-            total=Sum('apply_amount')
-        )['total'] or 0
+        from orders.models import Order, SalaryApplication, DashboardStats
+        # 汇总数据由写入时增量维护，这里只按主键读取一行
+        stats = DashboardStats.load()
+        total_teachers = stats.total_teachers
+        total_orders = stats.total_orders
+        pending_applications = stats.pending_applications
+        approved_amount = stats.approved_amount
         
         # 获取最新订单列表（最近5个）
-        latest_orders = Order.objects.order_by('-created_at')[:5]
+        latest_orders = Order.objects.select_related('teacher').order_by('-created_at')[:5]
         # 获取待审核工资申请列表
-        pending_applications_list = SalaryApplication.objects.filter(status='pending').order_by('-created_at')[:5]
+        pending_applications_list = SalaryApplication.objects.select_related('teacher').filter(status='pending').order_by('-created_at')[:5]
         
         context = {
             'total_teachers': total_teachers,
@@ -343,7 +330,7 @@ def dashboard(request):
         # 获取教师最近的5个订单
         my_orders = Order.objects.filter(teacher=request.user).order_by('-created_at')[:5]
         # 获取教师最近的5个工资申请
-        my_applications = SalaryApplication.objects.filter(teacher=request.user).order_by('-created_at')[:5]
+        my_applications = SalaryApplication.objects.select_related('order').filter(teacher=request.user).order_by('-created_at')[:5]
         
         context = {
             'my_orders': my_orders,
@@ -396,9 +383,6 @@ def profile_edit(request):
 # 管理员管理教师列表视图
 @login_required
 @role_required(['super_admin', 'admin'])
-@cache_page(60 * 5)  # 缓存5分钟
-@vary_on_cookie
-@vary_on_headers('User-Agent')
 def admin_teacher_list(request):
     """管理员查看教师列表"""
     from django.db.models import Q
@@ -409,7 +393,7 @@ def admin_teacher_list(request):
     is_approved = request.GET.get('is_approved', '')
     
     # 构建查询
-    teachers = User.objects.filter(role='teacher')
+    teachers = User.objects.select_related('teacher_info').filter(role='teacher')
     
     if search:
         teachers = teachers.filter(
@@ -431,6 +415,11 @@ def admin_teacher_list(request):
     # 排序
     teachers = teachers.order_by('-id')
     
+    # 所有管理员共享查询结果，教师或教师信息变更后缓存自动失效
+    teachers = cached_view_data(
+        request, 'admin_teacher_list', 'admin', (User, TeacherInfo), lambda: list(teachers)
+    )
+    
     context = {
         'teachers': teachers,
         'search': search,
@@ -443,23 +432,25 @@ def admin_teacher_list(request):
 # 管理员查看教师详情视图
 @login_required
 @role_required(['super_admin', 'admin'])
-@cache_page(60 * 5)  # 缓存5分钟
-@vary_on_cookie
-@vary_on_headers('User-Agent')
 def admin_teacher_detail(request, pk):
     """管理员查看教师详情"""
-    teacher = get_object_or_404(User, pk=pk, role='teacher')
-    
-    # 获取教师的订单和工资申请信息
-    from orders.models import Order, SalaryApplication
-    orders = Order.objects.filter(teacher=teacher).order_by('-created_at')[:10]
-    applications = SalaryApplication.objects.filter(teacher=teacher).order_by('-created_at')[:10]
+    from orders.models import Order, SalaryApplication, TeacherMonthlyStats
+    
+    def load():
+        teacher = get_object_or_404(User.objects.select_related('teacher_info'), pk=pk, role='teacher')
+        return {
+            'teacher': teacher,
+            # 获取教师的订单和工资申请信息
+            'orders': list(Order.objects.filter(teacher=teacher).order_by('-created_at')[:10]),
+            'applications': list(SalaryApplication.objects.filter(teacher=teacher).order_by('-created_at')[:10]),
+            # 月度统计直接读取汇总表（最近12个月）
+            'monthly_stats': list(TeacherMonthlyStats.objects.filter(teacher=teacher)[:12]),
+        }
     
-    context = {
-        'teacher': teacher,
-        'orders': orders,
-        'applications': applications
-    }
+    context = cached_view_data(
+        request, 'admin_teacher_detail', f'teacher:{pk}',
+        (User, TeacherInfo, Order, SalaryApplication, TeacherMonthlyStats), load
+    )
     
     return render(request, 'admin/teacher_detail.html', context)
 
@@ -486,14 +477,12 @@ def admin_teacher_edit(request, pk):
             teacher.save()
             
             # 记录操作日志
-            OperationLog.objects.create(
+            OperationLog.record(
                 user=request.user,
                 action='update',
                 object_type='Teacher',
                 object_id=teacher.id,
-                object_name=teacher.username,
-                ip_address=request.META.get('REMOTE_ADDR'),
-                description=f'超级管理员{request.user.username}编辑了教师{teacher.username}的信息'
+                ip_address=request.META.get('REMOTE_ADDR')
             )
             
             messages.success(request, '教师信息已更新！')
@@ -521,14 +510,12 @@ def admin_teacher_approve(request, pk):
         teacher_info.save()
         
         # 记录操作日志
-        OperationLog.objects.create(
+        OperationLog.record(
             user=request.user,
             action='approve',
             object_type='Teacher',
             object_id=teacher.id,
-            object_name=teacher.username,
-            ip_address=request.META.get('REMOTE_ADDR'),
-            description=f'管理员{request.user.username}审核通过了教师{teacher.username}'
+            ip_address=request.META.get('REMOTE_ADDR')
         )
         
         messages.success(request, '教师审核通过！')
@@ -550,14 +537,12 @@ def admin_teacher_toggle(request, pk):
     
     # 记录操作日志
     action = 'enable' if teacher.is_active else 'disable'
-    OperationLog.objects.create(
+    OperationLog.record(
             user=request.user,
             action=action,
             object_type='Teacher',
             object_id=teacher.id,
-            object_name=teacher.username,
-            ip_address=request.META.get('REMOTE_ADDR'),
-            description=f'管理员{request.user.username} {'启用' if teacher.is_active else '禁用'}了教师{teacher.username}的账号'
+            ip_address=request.META.get('REMOTE_ADDR')
         )
     
     messages.success(request, f'教师账号已{'启用' if teacher.is_active else '禁用'}！')
@@ -571,14 +556,13 @@ def admin_teacher_delete(request, pk):
     teacher = get_object_or_404(User, pk=pk, role='teacher')
     
     # 记录操作日志
-    OperationLog.objects.create(
+    OperationLog.record(
         user=request.user,
         action='delete',
         object_type='Teacher',
         object_id=teacher.id,
-        object_name=teacher.username,
-        ip_address=request.META.get('REMOTE_ADDR'),
-        description=f'超级管理员{request.user.username}删除了教师{teacher.username}的账号'
+        params={'name': teacher.username},
+        ip_address=request.META.get('REMOTE_ADDR')
     )
     
     # 删除教师账号（级联删除会自动删除关联的TeacherInfo）
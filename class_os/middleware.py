@@ -0,0 +1,117 @@
+import logging
+import re
+import sys
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware as BaseGZipMiddleware
+from django.template.base import Node
+
+logger = logging.getLogger('class_os.queries')
+
+# IN (%s, %s, ...) 的参数个数不同，但属于同一类查询
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class RepeatedQueryError(Exception):
+    """同一形态的SQL在单个请求中执行次数超过阈值（疑似N+1查询）"""
+
+
+def query_shape(sql):
+    """将SQL归一化为查询形态，用于归并重复语句"""
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def _template_location():
+    """沿调用栈查找正在渲染的模板节点，返回 '模板名:行号'"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        # 使用type()而不是isinstance()，避免触发SimpleLazyObject（如request.user）求值
+        if issubclass(type(node), Node) and getattr(node, 'token', None) is not None:
+            origin = getattr(node, 'origin', None)
+            template_name = getattr(origin, 'template_name', None) or getattr(origin, 'name', '?')
+            return f'{template_name}:{node.token.lineno}'
+        frame = frame.f_back
+    return None
+
+
+class QueryRecorder:
+    """记录一次请求中执行的SQL，按形态分组"""
+
+    def __init__(self):
+        self.shapes = defaultdict(int)
+        self.locations = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        shape = query_shape(sql)
+        self.shapes[shape] += 1
+        # 首次执行可能来自中间件或视图代码，优先记录模板中的触发位置
+        if self.locations.get(shape) is None:
+            self.locations[shape] = _template_location()
+        return execute(sql, params, many, context)
+
+    def repeated(self, threshold):
+        return [
+            (shape, count, self.locations.get(shape))
+            for shape, count in self.shapes.items()
+            if count > threshold
+        ]
+
+
+class RepeatedQueryMiddleware:
+    """
+    开发/预发布环境使用的N+1查询检测中间件。
+
+    需在settings中设置 QUERY_DETECTOR_ENABLED = True 才会启用。同一形态的SQL在一次请求中
+    执行超过 QUERY_DETECTOR_THRESHOLD 次时记录警告，QUERY_DETECTOR_RAISE = True 时直接抛出异常，
+    提示中包含视图名称和首次触发该查询的模板行。
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_DETECTOR_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'QUERY_DETECTOR_THRESHOLD', 5)
+        self.raise_error = getattr(settings, 'QUERY_DETECTOR_RAISE', False)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        repeated = recorder.repeated(self.threshold)
+        if repeated:
+            match = getattr(request, 'resolver_match', None)
+            view_name = match.view_name if match else request.path
+            lines = [
+                f'{count}次 [{location or "视图代码"}] {shape}'
+                for shape, count, location in sorted(repeated, key=lambda item: -item[1])
+            ]
+            message = f'视图 {view_name} 存在重复查询（阈值{self.threshold}）：\n' + '\n'.join(lines)
+            if self.raise_error:
+                raise RepeatedQueryError(message)
+            logger.warning(message)
+
+        return response
+
+
+class GZipMiddleware(BaseGZipMiddleware):
+    """
+    GZip压缩，跳过设置了 gzip_exempt = True 的响应。
+
+    受保护媒体文件（orders.media.send_file）不压缩：压缩后 Content-Range 与实际传输的字节不对应，
+    强ETag也会被改为弱ETag；证明材料多为已压缩的图片和PDF，再压缩也没有收益。
+    """
+
+    def process_response(self, request, response):
+        if getattr(response, 'gzip_exempt', False):
+            return response
+        return super().process_response(request, response)
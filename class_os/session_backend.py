@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+SAVED_AT_KEY = '_session_saved_at'
+
+
+class SessionStore(CachedDBStore):
+    """
+    合并写入的会话存储：读取走缓存（cached_db），SESSION_SAVE_EVERY_REQUEST 触发的保存只在必要时写库。
+
+    会话数据未修改时，只有距上次写入超过 SESSION_COOKIE_AGE * SESSION_WRITE_THRESHOLD 才写库延长过期时间，
+    否则跳过（浏览器端的Cookie过期时间仍每次刷新）。因此服务端过期时间最多比实际活动时间早
+    该比例的会话时长：默认30分钟会话、阈值0.1时，连续空闲27至30分钟之间的会话可能已过期。
+    """
+
+    def save(self, must_create=False):
+        if not must_create and not self.modified and self.session_key and not self._write_due():
+            return
+        self._session[SAVED_AT_KEY] = int(time.time())
+        super().save(must_create)
+
+    def _write_due(self):
+        saved_at = self._session.get(SAVED_AT_KEY)
+        if saved_at is None:
+            return True
+        threshold = getattr(settings, 'SESSION_WRITE_THRESHOLD', 0.1)
+        return time.time() - saved_at >= self.get_expiry_age() * threshold
@@ -50,7 +50,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "django.middleware.gzip.GZipMiddleware",  # 添加GZip压缩中间件
+    "class_os.middleware.GZipMiddleware",  # GZip压缩（受保护媒体文件除外）
+    "class_os.middleware.RepeatedQueryMiddleware",  # N+1查询检测（默认关闭）
 ]
 
 ROOT_URLCONF = "class_os.urls"
@@ -59,17 +60,26 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
-        "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
             ],
+            # 显式使用缓存加载器：模板在进程内只解析一次（与 APP_DIRS 不能同时设置）
+            "loaders": [
+                ("django.template.loaders.cached.Loader", [
+                    "django.template.loaders.filesystem.Loader",
+                    "django.template.loaders.app_directories.Loader",
+                ]),
+            ],
         },
     },
 ]
 
+# 工作进程启动时（wsgi.py）预编译 templates/ 下的所有模板
+TEMPLATE_WARMUP = True
+
 WSGI_APPLICATION = "class_os.wsgi.application"
 
 
@@ -128,14 +138,38 @@ STATICFILES_DIRS = [
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# 受保护媒体文件的传输方式：
+#   None       由Django分块输出（支持Range/If-None-Match）
+#   'nginx'    返回X-Accel-Redirect，需配置 internal 的 PROTECTED_MEDIA_INTERNAL_URL 指向 MEDIA_ROOT
+#   'sendfile' 返回X-Sendfile（Apache mod_xsendfile / lighttpd）
+PROTECTED_MEDIA_SERVER = None
+PROTECTED_MEDIA_INTERNAL_URL = "/protected-media/"
+
 # 文件上传设置
 FILE_UPLOAD_MAX_MEMORY_SIZE = 3 * 1024 * 1024  # 3MB
 FILE_UPLOAD_PERMISSIONS = 0o644  # 上传文件权限
 FILE_UPLOAD_DIRECTORY_PERMISSIONS = 0o755  # 上传目录权限
 
+# 证明材料缩略图
+THUMBNAIL_ASYNC = True  # 上传后在后台线程池中生成，False时在请求内同步生成
+THUMBNAIL_WORKERS = 2  # 后台生成线程数
+THUMBNAIL_FORMAT = "JPEG"  # JPEG 或 WEBP（需Pillow支持WEBP）；修改后旧缩略图需用 generate_thumbnails 重新生成
+
+# 操作日志写入
+OPERATION_LOG_ASYNC = True  # 后台线程批量写入，False时在请求内同步写入（测试使用）
+OPERATION_LOG_BATCH_SIZE = 100  # 缓冲达到该条数时立即写入
+OPERATION_LOG_FLUSH_INTERVAL = 1.0  # 最长写入间隔（秒）
+OPERATION_LOG_SPOOL_DIR = BASE_DIR / "logs" / "operation_log"  # 预写文件目录，进程崩溃后据此补写
+OPERATION_LOG_FSYNC = False  # 每条日志落盘时是否fsync（防断电，代价较高）
+OPERATION_LOG_HOT_MONTHS = 3  # 数据库中保留的月份数（含当月），更早的日志由 archive_operation_logs 归档
+OPERATION_LOG_ARCHIVE_DIR = BASE_DIR / "logs" / "archive"  # 归档文件目录（每月一个 .jsonl.gz）
+
 # 自定义用户模型
 AUTH_USER_MODEL = "accounts.User"
 
+# 每个请求加载 request.user 时先查共享缓存，用户保存后按版本号失效
+AUTHENTICATION_BACKENDS = ["accounts.backends.CachedModelBackend"]
+
 # 登录安全设置
 LOGIN_URL = "accounts:login"
 LOGIN_REDIRECT_URL = "dashboard"
@@ -144,10 +178,14 @@ LOGOUT_REDIRECT_URL = "accounts:login"
 # 会话超时设置
 SESSION_COOKIE_AGE = 30 * 60  # 30分钟
 SESSION_SAVE_EVERY_REQUEST = True
+# 会话读取走缓存；数据未修改时，只在距上次写入超过会话时长的该比例后才写库延长过期时间
+SESSION_ENGINE = "class_os.session_backend"
+SESSION_WRITE_THRESHOLD = 0.1
 
-# 登录失败限制
-LOGIN_FAILURE_LIMIT = 5
-LOGIN_FAILURE_COOLOFF_TIME = 15 * 60  # 15分钟
+# 登录失败限制（滑动窗口计数，在校验密码之前检查，见 accounts/throttle.py）
+LOGIN_FAILURE_LIMIT = 5  # 同一用户名在窗口内的失败上限
+LOGIN_FAILURE_IP_LIMIT = 20  # 同一IP在窗口内的失败上限（同一出口IP后可能有多个用户）
+LOGIN_FAILURE_COOLOFF_TIME = 15 * 60  # 窗口长度，15分钟
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -176,22 +214,32 @@ if not DEBUG:
 # 性能优化设置
 
 # 缓存设置
+# 使用WAL模式的SQLite文件作为缓存，所有工作进程共享（视图缓存失效、计数器等需跨进程生效）
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'class-os-cache',
+        'BACKEND': 'class_os.sqlite_cache.SQLiteCache',
+        'LOCATION': BASE_DIR / 'cache' / 'default.sqlite3',
         'TIMEOUT': 300,  # 缓存超时时间，5分钟
         'OPTIONS': {
-            'MAX_ENTRIES': 1000,  # 最大缓存条目数
+            'MAX_ENTRIES': 5000,  # 最大缓存条目数
+            'CULL_PROBABILITY': 0.01,  # 每次写入时检查条目数的概率
         }
     }
 }
 
+# 视图数据缓存的过期时间（秒），数据变更时按模型代数自动失效
+VIEW_CACHE_TIMEOUT = 30 * 60
+
 # 静态文件优化
 STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'  # 启用静态文件指纹
 
 # 数据库查询优化
 DATABASES['default']['CONN_MAX_AGE'] = 60  # 数据库连接池，保持连接60秒
 
+# N+1查询检测（开发/预发布环境开启）
+QUERY_DETECTOR_ENABLED = DEBUG
+QUERY_DETECTOR_THRESHOLD = 5  # 同一形态SQL单次请求允许的最大执行次数
+QUERY_DETECTOR_RAISE = False  # True时直接抛出异常，False时仅记录警告
+
 # 减少HTTP请求头大小
 SECURE_REFERRER_POLICY = 'same-origin'
\ No newline at end of file
@@ -0,0 +1,238 @@
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB,
+    expires REAL,
+    accessed REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_expires_idx ON cache (expires);
+CREATE INDEX IF NOT EXISTS cache_accessed_idx ON cache (accessed);
+"""
+
+
+class SQLiteCache(BaseCache):
+    """
+    基于WAL模式SQLite文件的缓存后端，同一主机上的多个工作进程共享同一份缓存。
+
+    LOCATION 为数据库文件路径。整数直接以INTEGER存储，incr 在写事务（BEGIN IMMEDIATE）中读取并更新，多进程并发递增不会丢失；
+    其他值以pickle存储。过期条目在读取时视为不存在，并在清理时删除；条目数超过 MAX_ENTRIES 时
+    先删除过期条目，再按最近访问时间删除最久未用的 1/CULL_FREQUENCY。
+
+    OPTIONS：
+      MAX_ENTRIES / CULL_FREQUENCY  与Django内置后端相同
+      CULL_PROBABILITY              每次写入时检查条目数的概率（默认0.01），避免每次写入都统计
+      ACCESS_RESOLUTION             最近访问时间的更新间隔（秒，默认60），命中时不必每次都写库
+      BUSY_TIMEOUT                  等待其他进程写锁的最长时间（秒，默认5）
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = str(location)
+        options = params.get('OPTIONS', {})
+        self._cull_probability = float(options.get('CULL_PROBABILITY', 0.01))
+        self._access_resolution = float(options.get('ACCESS_RESOLUTION', 60))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    # 连接：每个进程的每个线程各一个（sqlite3连接不能跨线程或跨fork使用）
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=self._busy_timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # WAL模式下NORMAL只在检查点时同步，缓存数据丢失最近的写入可以接受
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(_SCHEMA)
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def _write(self, statements):
+        """在一个写事务中执行多条语句，返回最后一条语句影响的行数"""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            rowcount = 0
+            for sql, params in statements:
+                rowcount = connection.execute(sql, params).rowcount
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return rowcount
+
+    def _encode(self, value):
+        # bool是int的子类，但取回时应保持bool，因此与其他对象一样序列化
+        if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+            return value
+        return pickle.dumps(value, self.pickle_protocol)
+
+    @staticmethod
+    def _decode(value):
+        return value if isinstance(value, int) else pickle.loads(value)
+
+    def get_backend_timeout(self, timeout=DEFAULT_TIMEOUT):
+        """返回过期时间点（time.time()），None 表示永不过期"""
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return time.time() + timeout
+
+    # 读取
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._get_many([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        return {key_map[key]: value for key, value in self._get_many(list(key_map)).items()}
+
+    def _get_many(self, keys):
+        if not keys:
+            return {}
+        now = time.time()
+        rows = self._connection().execute(
+            f'SELECT key, value, expires, accessed FROM cache WHERE key IN ({", ".join("?" * len(keys))})', keys
+        ).fetchall()
+        result, stale = {}, []
+        for key, value, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                continue
+            result[key] = self._decode(value)
+            if accessed < now - self._access_resolution:
+                stale.append(key)
+        if stale:
+            # 只在访问时间明显过期时才写库，命中大多是纯读
+            self._write([(
+                f'UPDATE cache SET accessed = ? WHERE key IN ({", ".join("?" * len(stale))})', [now, *stale]
+            )])
+        return result
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone() is not None
+
+    # 写入
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._set_many({key: value}, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set_many({self.make_and_validate_key(key, version=version): value for key, value in data.items()}, timeout)
+        return []
+
+    def _set_many(self, data, timeout):
+        if not data:
+            return
+        if timeout == 0:
+            # 与Django内置后端一致：超时为0表示立即过期
+            self._write([(f'DELETE FROM cache WHERE key IN ({", ".join("?" * len(data))})', list(data))])
+            return
+        expires, now = self.get_backend_timeout(timeout), time.time()
+        self._write([
+            ('REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+             (key, self._encode(value), expires, now))
+            for key, value in data.items()
+        ])
+        self._maybe_cull()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        # 键不存在或已过期时写入，已有未过期的值则不变
+        added = self._write([(
+            'INSERT INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires, '
+            'accessed = excluded.accessed WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+            (key, self._encode(value), self.get_backend_timeout(timeout), now, now)
+        )])
+        if added:
+            self._maybe_cull()
+        return bool(added)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        return bool(self._write([(
+            'UPDATE cache SET expires = ?, accessed = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), now, key, now)
+        )]))
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, now)
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            if not isinstance(row[0], int):
+                raise TypeError(f"Value of key '{key}' is not an integer")
+            value = row[0] + delta
+            connection.execute('UPDATE cache SET value = ?, accessed = ? WHERE key = ?', (value, now, key))
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return value
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return bool(self._write([('DELETE FROM cache WHERE key = ?', (key,))]))
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            self._write([(f'DELETE FROM cache WHERE key IN ({", ".join("?" * len(keys))})', keys)])
+
+    def clear(self):
+        self._write([('DELETE FROM cache', ())])
+
+    def close(self, **kwargs):
+        # 连接在线程内复用，请求结束时不关闭
+        pass
+
+    # 淘汰
+
+    def _maybe_cull(self):
+        if random.random() < self._cull_probability:
+            self.cull()
+
+    def cull(self):
+        """删除过期条目；仍超过 MAX_ENTRIES 时删除最久未访问的 1/CULL_FREQUENCY"""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+            count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+            if count > self._max_entries:
+                limit = count // self._cull_frequency if self._cull_frequency else count
+                connection.execute(
+                    'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)', (limit,)
+                )
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from . import session_backend
+from .sqlite_cache import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        return SQLiteCache(os.path.join(self.directory, 'cache.sqlite3'), {'OPTIONS': options})
+
+    def test_values_round_trip(self):
+        values = {'int': 5, 'bool': True, 'big': 2 ** 70, 'list': [1, {'a': '中文'}], 'none': None}
+        self.cache.set_many(values)
+        self.assertEqual(self.cache.get_many(list(values)), values)
+        self.assertIs(self.cache.get('bool'), True)
+        self.assertEqual(self.cache.get('missing', 'default'), 'default')
+
+    def test_add_and_expiry(self):
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertEqual(self.cache.get('key'), 1)
+
+        self.cache.set('key', 1, timeout=-1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertFalse(self.cache.has_key('key'))
+        # 已过期的键可以重新 add
+        self.assertTrue(self.cache.add('key', 3))
+        self.assertEqual(self.cache.get('key'), 3)
+
+        self.cache.set('key', 1, timeout=0)
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_incr(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        self.assertEqual(self.cache.decr('counter'), 2)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.set('text', 'a')
+        with self.assertRaises(TypeError):
+            self.cache.incr('text')
+
+    def test_concurrent_incr_is_not_lost(self):
+        # 每个线程各自打开连接，与多个工作进程并发写同一文件相同
+        self.cache.set('counter', 0, None)
+
+        def work():
+            for _ in range(50):
+                self.cache.incr('counter')
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_shared_between_instances(self):
+        self.cache.set('key', 'value')
+        self.assertEqual(self.make_cache().get('key'), 'value')
+        self.make_cache().delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_cull_removes_expired_then_least_recently_used(self):
+        cache = self.make_cache(MAX_ENTRIES=4, CULL_FREQUENCY=2, CULL_PROBABILITY=0, ACCESS_RESOLUTION=0)
+        cache.set('expired', 1, timeout=-1)
+        with mock.patch('class_os.sqlite_cache.time.time', side_effect=[100.0, 101.0, 102.0, 103.0]):
+            for key in ('a', 'b', 'c', 'd'):
+                cache.set(key, key, None)
+        cache.set('e', 'e', None)
+        cache.get('a')
+        cache.cull()
+        # 过期条目删除后剩5条，超过上限，删除最久未访问的2条（b、c）
+        self.assertEqual(sorted(cache.get_many(['a', 'b', 'c', 'd', 'e'])), ['a', 'd', 'e'])
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    SESSION_COOKIE_AGE=1000,
+    SESSION_WRITE_THRESHOLD=0.1,
+)
+class SessionStoreTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        session = session_backend.SessionStore()
+        session['user'] = 1
+        session.save()
+        self.session_key = session.session_key
+
+    def expire_date(self):
+        return Session.objects.get(session_key=self.session_key).expire_date
+
+    def test_unmodified_session_is_not_written_within_threshold(self):
+        session = session_backend.SessionStore(self.session_key)
+        self.assertEqual(session['user'], 1)
+        with self.assertNumQueries(0):
+            session.save()
+
+    def test_unmodified_session_is_written_after_threshold(self):
+        expire_date = self.expire_date()
+        saved_at = session_backend.SessionStore(self.session_key)[session_backend.SAVED_AT_KEY]
+        session = session_backend.SessionStore(self.session_key)
+        session.load()
+        with mock.patch.object(session_backend.time, 'time', return_value=saved_at + 100):
+            session.save()
+        self.assertGreater(self.expire_date(), expire_date)
+
+    def test_modified_session_is_written(self):
+        session = session_backend.SessionStore(self.session_key)
+        session['user'] = 2
+        session.save()
+        self.assertEqual(Session.objects.get(session_key=self.session_key).get_decoded()['user'], 2)
@@ -15,11 +15,14 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from accounts.views import dashboard
+from orders.views import protected_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -31,5 +34,7 @@ urlpatterns = [
 # 静态文件URL配置
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
-# 媒体文件URL配置
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# 媒体文件URL配置（需登录并校验权限，可交由前端服务器传输）
+urlpatterns += [
+    re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), protected_media, name='protected_media'),
+]
\ No newline at end of file
@@ -0,0 +1,81 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.safestring import mark_safe
+
+GENERATION_KEY = 'generation:{}'
+
+
+def generations(models):
+    """各模型当前的数据代数，模型数据每次变更后递增"""
+    keys = [GENERATION_KEY.format(model._meta.label_lower) for model in models]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            # 以时间作为初始值：计数器被淘汰后重新初始化，也不会与旧缓存的代数相同
+            cache.add(key, time.time_ns(), timeout=None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def bump(*models):
+    """在当前事务提交后递增模型的数据代数，使依赖这些模型的视图缓存失效"""
+    transaction.on_commit(lambda: _increment(models))
+
+
+def _increment(models):
+    for model in models:
+        key = GENERATION_KEY.format(model._meta.label_lower)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def normalized_query(request):
+    """去掉空值并排序后的查询参数，参数顺序不同的相同查询共用缓存"""
+    return urlencode(sorted(
+        (key, value) for key, values in request.GET.lists() for value in values if value != ''
+    ))
+
+
+def cached_view_data(request, name, scope, models, build, timeout=None):
+    """
+    缓存视图的查询结果（而非整个响应），所有同一范围的用户共享。
+
+    缓存键由 视图名 + 数据范围（如 'admin' 或 'teacher:<id>'）+ 规范化查询参数 + 依赖模型的代数 组成，
+    模型保存或删除后代数递增，旧缓存不再被命中，编辑后立即可见。模板仍按当前用户渲染，
+    CSRF令牌、消息提示和按角色显示的按钮不受共享缓存影响。
+    """
+    raw = '|'.join([name, str(scope), normalized_query(request), *map(str, generations(models))])
+    key = 'view:' + hashlib.md5(raw.encode()).hexdigest()
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, timeout or getattr(settings, 'VIEW_CACHE_TIMEOUT', 30 * 60))
+    return data
+
+
+def cached_fragments(name, objects, version, render_fragment, timeout=None):
+    """
+    逐个对象缓存渲染好的HTML片段（如列表中的一行），返回与 objects 顺序一致的片段列表。
+
+    缓存键由 片段名 + 对象主键 + version(obj) 组成，version 返回对象及片段中显示的关联数据的版本
+    （如 updated_at、关联用户名）。一页数据只需一次 get_many，某个对象变更后只重新渲染这一行。
+    """
+    keys = [
+        'fragment:' + hashlib.md5('|'.join([name, str(obj.pk), *map(str, version(obj))]).encode()).hexdigest()
+        for obj in objects
+    ]
+    fragments = cache.get_many(keys)
+    missing = {}
+    for key, obj in zip(keys, objects):
+        if key not in fragments:
+            fragments[key] = missing[key] = render_fragment(obj)
+    if missing:
+        cache.set_many(missing, timeout or getattr(settings, 'VIEW_CACHE_TIMEOUT', 30 * 60))
+    return [mark_safe(fragments[key]) for key in keys]
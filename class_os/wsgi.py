@@ -29,6 +29,11 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "class_os.settings")
 
 application = get_wsgi_application()
 
+# 预编译模板，避免新工作进程的首个请求解析模板
+if getattr(settings, 'TEMPLATE_WARMUP', False):
+    from class_os.template_warmup import warm_up
+    warm_up()
+
 # 配置静态文件和媒体文件的处理
 from django.contrib.staticfiles.handlers import StaticFilesHandler
 application = StaticFilesHandler(application)
\ No newline at end of file
@@ -0,0 +1,34 @@
+import csv
+
+from django.http import StreamingHttpResponse
+
+# 每次从数据库游标读取的行数
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """仅实现write的伪文件对象，csv.writer写入的内容直接返回给调用方"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(filename, header, rows):
+    """
+    以流式响应输出CSV。
+
+    rows应为逐行产出的可迭代对象（例如 values_list().iterator()），
+    响应按行生成，不在内存中构建模型实例或完整文件。
+    """
+    writer = csv.writer(Echo())
+
+    def generate():
+        # UTF-8 BOM，保证Excel正确识别中文
+        yield '\ufeff'
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(generate(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
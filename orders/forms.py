@@ -35,6 +35,21 @@ class OrderForm(forms.ModelForm):
         cleaned_data = super(OrderForm, self).clean()
         return cleaned_data
 
+# 订单批量导入表单
+class OrderImportUploadForm(forms.Form):
+    csv_file = forms.FileField(
+        label='CSV文件',
+        widget=forms.FileInput(attrs={'class': 'form-control', 'accept': '.csv'})
+    )
+    
+    def clean_csv_file(self):
+        csv_file = self.cleaned_data.get('csv_file')
+        
+        if csv_file and not csv_file.name.lower().endswith('.csv'):
+            raise forms.ValidationError('只支持CSV文件')
+        
+        return csv_file
+
 # 工资申请表单
 class SalaryApplicationForm(forms.ModelForm):
     class Meta:
@@ -59,17 +74,10 @@ class SalaryApplicationForm(forms.ModelForm):
         
         # 只显示当前教师的已完成订单，并且该订单没有待审核或已通过的工资申请
         if self.user:
-            # 获取当前教师的已完成订单
-            completed_orders = Order.objects.filter(teacher=self.user, status='completed')
-            
-            # 获取已有有效工资申请的订单ID列表
-            applied_order_ids = SalaryApplication.objects.filter(
-                order__in=completed_orders,
-                status__in=['pending', 'approved']
-            ).values_list('order_id', flat=True)
-            
-            # 排除已有有效工资申请的订单
-            self.fields['order'].queryset = completed_orders.exclude(id__in=applied_order_ids)
+            # has_active_application 由工资申请写入时维护，可直接命中部分索引
+            self.fields['order'].queryset = Order.objects.filter(
+                teacher=self.user, status='completed', has_active_application=False
+            )
     
     def clean_apply_amount(self):
         apply_amount = self.cleaned_data.get('apply_amount')
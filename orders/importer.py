@@ -0,0 +1,167 @@
+import csv
+import io
+
+from django import forms
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import User
+from class_os import view_cache
+from . import search
+from .forms import OrderForm
+from .models import Order, OperationLog, NumberSequence, DashboardStats, TeacherMonthlyStats
+
+# 每批写入的行数
+IMPORT_BATCH_SIZE = 500
+
+# CSV表头 -> 表单字段，同时兼容导出文件的中文表头
+HEADER_ALIASES = {
+    'name': 'name',
+    '订单名称': 'name',
+    'teacher': 'teacher',
+    '分配教师': 'teacher',
+    '教师': 'teacher',
+    'student_count': 'student_count',
+    '服务学生数': 'student_count',
+    'service_type': 'service_type',
+    '服务类型': 'service_type',
+    'unit_price': 'unit_price',
+    '单价': 'unit_price',
+    'total_hours': 'total_hours',
+    '总时长': 'total_hours',
+    'status': 'status',
+    '订单状态': 'status',
+}
+
+REQUIRED_COLUMNS = ('name', 'teacher', 'student_count', 'service_type', 'unit_price', 'total_hours')
+
+
+class OrderImportForm(OrderForm):
+    """
+    导入时逐行校验的表单，沿用OrderForm的字段和校验规则。
+
+    教师字段改为按用户名在预先加载的字典中查找，避免每行各查询一次数据库。
+    """
+    teacher = forms.CharField(label='分配教师')
+
+    def __init__(self, *args, **kwargs):
+        self.teachers = kwargs.pop('teachers')
+        super().__init__(*args, **kwargs)
+
+    def _get_validation_exclusions(self):
+        # 教师已在clean_teacher中校验，跳过模型层外键存在性检查（每行一次查询）
+        exclude = super()._get_validation_exclusions()
+        exclude.add('teacher')
+        return exclude
+
+    def clean_teacher(self):
+        username = self.cleaned_data['teacher'].strip()
+        teacher = self.teachers.get(username)
+        if teacher is None:
+            raise forms.ValidationError(f'教师“{username}”不存在')
+        return teacher
+
+
+class ImportResult:
+    def __init__(self):
+        self.errors = []  # [(行号, 错误信息)]
+        self.orders = []
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+def _normalize_row(row):
+    """将CSV行的表头和中文选项值转换为表单可接受的数据"""
+    data = {}
+    for key, value in row.items():
+        field = HEADER_ALIASES.get((key or '').strip())
+        if field:
+            data[field] = (value or '').strip()
+    for field, choices in (('service_type', Order.SERVICE_TYPE_CHOICES), ('status', Order.STATUS_CHOICES)):
+        display_to_value = {display: value for value, display in choices}
+        if data.get(field) in display_to_value:
+            data[field] = display_to_value[data[field]]
+    data.setdefault('status', 'pending')
+    if not data['status']:
+        data['status'] = 'pending'
+    return data
+
+
+def read_csv(file):
+    """读取上传文件或本地文件，兼容带BOM的UTF-8"""
+    content = file.read()
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    elif content.startswith('\ufeff'):
+        content = content[1:]
+    return csv.DictReader(io.StringIO(content))
+
+
+def import_orders(file, created_by, ip_address=''):
+    """
+    从CSV批量导入订单。
+
+    先逐行校验，任意一行出错则不写入并返回全部行的错误信息；全部通过后在同一事务中
+    分配编号，并用bulk_create批量写入订单和对应的操作日志。
+    """
+    result = ImportResult()
+    reader = read_csv(file)
+
+    columns = {HEADER_ALIASES.get((name or '').strip()) for name in (reader.fieldnames or [])}
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        result.errors.append((1, f'缺少列：{", ".join(missing)}'))
+        return result
+
+    # 一次查询取出所有教师，按用户名查找
+    teachers = {teacher.username: teacher for teacher in User.objects.filter(role='teacher')}
+
+    orders = []
+    # 第1行为表头，数据从第2行开始
+    for line_number, row in enumerate(reader, start=2):
+        form = OrderImportForm(_normalize_row(row), teachers=teachers)
+        if not form.is_valid():
+            messages = [
+                f'{form.fields[field].label}：{"；".join(errors)}' if field in form.fields else '；'.join(errors)
+                for field, errors in form.errors.items()
+            ]
+            result.errors.append((line_number, '；'.join(messages)))
+            continue
+        order = form.save(commit=False)
+        order.created_by = created_by
+        # bulk_create不会调用save()，需在此计算总金额
+        order.total_amount = order.unit_price * order.total_hours
+        orders.append(order)
+
+    if result.errors or not orders:
+        return result
+
+    with transaction.atomic():
+        # 一次预留当天的一段连续订单编号
+        prefix = timezone.now().strftime('ORD%Y%m%d')
+        for order, order_number in zip(orders, NumberSequence.next_numbers(prefix, len(orders))):
+            order.order_number = order_number
+        Order.objects.bulk_create(orders, batch_size=IMPORT_BATCH_SIZE)
+
+        OperationLog.objects.bulk_create([
+            OperationLog(
+                user=created_by,
+                action='create',
+                object_type='Order',
+                object_id=order.id,
+                params={'via': 'import'},
+                ip_address=ip_address
+            )
+            for order in orders
+        ], batch_size=IMPORT_BATCH_SIZE)
+
+        search.index_orders(orders)
+        # bulk_create不触发信号，直接更新仪表盘和教师月度统计
+        DashboardStats.adjust(total_orders=len(orders))
+        TeacherMonthlyStats.apply(new=[TeacherMonthlyStats.order_contribution(order) for order in orders])
+        view_cache.bump(Order, OperationLog, TeacherMonthlyStats)
+
+    result.orders = orders
+    return result
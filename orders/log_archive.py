@@ -0,0 +1,173 @@
+import datetime
+import gzip
+import heapq
+import json
+import os
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from class_os import view_cache
+
+from . import log_messages
+
+# 归档文件：每月一个gzip压缩的JSON Lines文件
+ARCHIVE_NAME = 'operation_log-{:%Y-%m}.jsonl.gz'
+_ARCHIVE_FILE = re.compile(r'^operation_log-(\d{4})-(\d{2})\.jsonl\.gz$')
+
+ARCHIVE_FIELDS = ('id', 'user_id', 'action', 'object_type', 'object_id', 'params', 'ip_address', 'created_at')
+EXPORT_CHUNK_SIZE = 2000
+
+# 单次查询从归档中最多返回的日志条数
+ARCHIVE_RESULT_LIMIT = 1000
+
+
+def archive_dir():
+    return str(getattr(settings, 'OPERATION_LOG_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'logs', 'archive')))
+
+
+def hot_cutoff(keep_months=None):
+    """热数据的起始时间：保留当月及之前 keep_months-1 个月，更早的日志可归档"""
+    keep_months = keep_months or getattr(settings, 'OPERATION_LOG_HOT_MONTHS', 3)
+    month = add_months(timezone.localdate().replace(day=1), 1 - keep_months)
+    return _month_start(month)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def archived_months():
+    """已归档的月份（每月第一天），从早到晚排列"""
+    directory = archive_dir()
+    if not os.path.isdir(directory):
+        return []
+    months = []
+    for filename in os.listdir(directory):
+        match = _ARCHIVE_FILE.match(filename)
+        if match:
+            months.append(datetime.date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def archive_old_logs(keep_months=None):
+    """将热数据范围之前的日志按月导出到归档文件并从数据库删除，返回 [(月份, 条数)]"""
+    from .models import OperationLog
+
+    cutoff = hot_cutoff(keep_months)
+    oldest = OperationLog.objects.filter(created_at__lt=cutoff).order_by('created_at').values_list(
+        'created_at', flat=True
+    ).first()
+    if oldest is None:
+        return []
+
+    archived = []
+    month = timezone.localtime(oldest).date().replace(day=1)
+    while _month_start(month) < cutoff:
+        count = archive_month(month)
+        if count:
+            archived.append((month, count))
+        month = add_months(month, 1)
+    return archived
+
+
+def archive_month(month):
+    """归档一个月的日志，返回归档条数。该月已有归档文件时追加"""
+    from .models import OperationLog
+
+    logs = OperationLog.objects.filter(
+        created_at__gte=_month_start(month), created_at__lt=_month_start(add_months(month, 1))
+    )
+    max_id = logs.order_by('-id').values_list('id', flat=True).first()
+    if max_id is None:
+        return 0
+    logs = logs.filter(id__lte=max_id)
+
+    os.makedirs(archive_dir(), exist_ok=True)
+    path = os.path.join(archive_dir(), ARCHIVE_NAME.format(month))
+    temp_path = path + '.tmp'
+
+    count = 0
+    with open(temp_path, 'wb') as file:
+        # 已有归档原样保留，新日志作为新的gzip成员追加在后面
+        if os.path.exists(path):
+            with open(path, 'rb') as existing:
+                for chunk in iter(lambda: existing.read(1024 * 1024), b''):
+                    file.write(chunk)
+        with gzip.GzipFile(fileobj=file, mode='wb') as archive:
+            for row in logs.order_by('id').values_list(*ARCHIVE_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+                data = dict(zip(ARCHIVE_FIELDS, row))
+                data['created_at'] = data['created_at'].isoformat()
+                archive.write((json.dumps(data, ensure_ascii=False) + '\n').encode('utf-8'))
+                count += 1
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+    # 归档文件落盘后再删除数据库中的记录
+    with transaction.atomic():
+        logs.delete()
+        view_cache.bump(OperationLog)
+    return count
+
+
+def iter_archived(month):
+    """逐条读取某月归档中的日志（字典）"""
+    path = os.path.join(archive_dir(), ARCHIVE_NAME.format(month))
+    if not os.path.exists(path):
+        return
+    with gzip.open(path, 'rt', encoding='utf-8') as archive:
+        for line in archive:
+            data = json.loads(line)
+            if 'description' in data:
+                # 日志结构化之前归档的旧格式
+                data = log_messages.convert_legacy(data)
+            data['created_at'] = parse_datetime(data['created_at'])
+            yield data
+
+
+def search_archive(start=None, end=None, action='', user_id='', search='', limit=ARCHIVE_RESULT_LIMIT):
+    """
+    在归档中按条件查询日志，start/end 为时区感知的时间（end不含）。
+
+    返回 (日志列表, 是否被截断)，日志为未保存的 OperationLog 实例，按时间倒序，最多 limit 条。
+    """
+    from accounts.models import User
+    from .models import OperationLog
+
+    months = [
+        month for month in archived_months()
+        if (start is None or _month_start(add_months(month, 1)) > start)
+        and (end is None or _month_start(month) < end)
+    ]
+    if not months:
+        return [], False
+
+    matches_search = log_messages.search_matcher(search) if search else None
+    matched = (
+        data for month in months for data in iter_archived(month)
+        if (start is None or data['created_at'] >= start)
+        and (end is None or data['created_at'] < end)
+        and (not action or data['action'] == action)
+        and (not user_id or str(data['user_id']) == str(user_id))
+        and (matches_search is None or matches_search(data))
+    )
+    rows = heapq.nlargest(limit + 1, matched, key=lambda data: (data['created_at'], data['id']))
+    truncated = len(rows) > limit
+    rows = rows[:limit]
+
+    users = User.objects.in_bulk({data['user_id'] for data in rows if data['user_id']})
+    logs = []
+    for data in rows:
+        log = OperationLog(**data)
+        log.user = users.get(data['user_id'])
+        logs.append(log)
+    return logs, truncated
+
+
+def _month_start(month):
+    return timezone.make_aware(datetime.datetime.combine(month, datetime.time.min))
@@ -0,0 +1,194 @@
+import re
+
+from django.db.models import Q
+
+# 操作描述模板，按 (对象类型, 操作类型[, 来源]) 查找，显示时再填入用户名、对象名称和参数。
+# 可用占位符：{actor} 操作用户，{target} 关联对象名称，{object_id} 对象ID，以及日志 params 中的键
+MESSAGES = {
+    ('User', 'login'): '用户{actor}登录系统',
+    ('User', 'logout'): '用户{actor}登出系统',
+    ('Admin', 'create'): '超级管理员{actor}创建了普通管理员{target}',
+    ('Admin', 'update'): '超级管理员{actor}编辑了管理员{target}的信息',
+    ('Admin', 'enable'): '超级管理员{actor} 启用了管理员{target}的账号',
+    ('Admin', 'disable'): '超级管理员{actor} 禁用了管理员{target}的账号',
+    ('Admin', 'delete'): '超级管理员{actor}删除了管理员{target}的账号',
+    ('Teacher', 'update'): '超级管理员{actor}编辑了教师{target}的信息',
+    ('Teacher', 'approve'): '管理员{actor}审核通过了教师{target}',
+    ('Teacher', 'enable'): '管理员{actor} 启用了教师{target}的账号',
+    ('Teacher', 'disable'): '管理员{actor} 禁用了教师{target}的账号',
+    ('Teacher', 'delete'): '超级管理员{actor}删除了教师{target}的账号',
+    ('Order', 'create'): '管理员{actor}创建了订单{target}',
+    ('Order', 'create', 'import'): '管理员{actor}通过批量导入创建了订单{target}',
+    ('Order', 'edit'): '管理员{actor}编辑了订单{target}',
+    ('Order', 'update'): '教师{actor}将订单{target}状态从{from_status}更新为{to_status}',
+    ('SalaryApplication', 'create'): '教师{actor}提交了工资申请{object_id}，申请金额：{amount}元',
+    ('SalaryApplication', 'approve'): '管理员{actor}通过了教师{target}的工资申请{object_id}',
+    ('SalaryApplication', 'approve', 'bulk'): '管理员{actor}批量通过了教师{target}的工资申请{object_id}',
+    ('SalaryApplication', 'reject'): '管理员{actor}拒绝了教师{target}的工资申请{object_id}',
+    ('SalaryApplication', 'reject', 'bulk'): '管理员{actor}批量拒绝了教师{target}的工资申请{object_id}',
+    ('SalaryApplication', 'withdraw'): '教师{actor}撤回了工资申请{object_id}',
+    ('Backup', 'create'): '管理员{actor}创建了数据备份：{file}',
+    ('Database', 'update'): '管理员{actor}从备份文件{file}恢复了数据',
+}
+
+USER_OBJECT_TYPES = ('User', 'Admin', 'Teacher')
+
+
+def render(log):
+    """按模板生成操作描述"""
+    params = log.params or {}
+    template = MESSAGES.get((log.object_type, log.action, params.get('via'))) \
+        or MESSAGES.get((log.object_type, log.action))
+    if template is None:
+        return params.get('text', '')
+
+    status_labels = _order_status_labels()
+    context = {
+        **params,
+        'actor': log.user.username if log.user else '未知用户',
+        'target': _target_name(log),
+        'object_id': log.object_id or '',
+        'from_status': status_labels.get(params.get('from'), params.get('from')),
+        'to_status': status_labels.get(params.get('to'), params.get('to')),
+    }
+    try:
+        return template.format(**context)
+    except KeyError:
+        return params.get('text', template)
+
+
+def object_name(log):
+    """日志列表中显示的对象名称"""
+    params = log.params or {}
+    if log.object_type == 'SalaryApplication':
+        return f'申请{log.object_id}'
+    if log.object_type == 'Backup':
+        return params.get('file', '')
+    if log.object_type == 'Database':
+        return 'Database'
+    return _target_name(log)
+
+
+def attach_targets(logs):
+    """按对象类型批量查询日志关联对象的名称，每种类型一次查询"""
+    from accounts.models import User
+    from .models import Order, SalaryApplication
+
+    ids = {}
+    for log in logs:
+        if log.object_id:
+            group = 'User' if log.object_type in USER_OBJECT_TYPES else log.object_type
+            ids.setdefault(group, set()).add(log.object_id)
+
+    names = {}
+    if 'User' in ids:
+        names['User'] = dict(User.objects.filter(id__in=ids['User']).values_list('id', 'username'))
+    if 'Order' in ids:
+        names['Order'] = dict(Order.objects.filter(id__in=ids['Order']).values_list('id', 'order_number'))
+    if 'SalaryApplication' in ids:
+        # 审核类描述中显示申请所属教师
+        names['SalaryApplication'] = dict(
+            SalaryApplication.objects.filter(id__in=ids['SalaryApplication']).values_list('id', 'teacher__username')
+        )
+
+    for log in logs:
+        group = 'User' if log.object_type in USER_OBJECT_TYPES else log.object_type
+        log._target_name = names.get(group, {}).get(log.object_id)
+    return logs
+
+
+def search_filter(search):
+    """日志搜索条件：IP地址、操作用户、关联用户或订单编号、对象ID"""
+    from accounts.models import User
+    from .models import Order
+
+    users = User.objects.filter(username__icontains=search).values('id')
+    orders = Order.objects.filter(order_number__icontains=search).values('id')
+    condition = (
+        Q(ip_address__icontains=search)
+        | Q(user__username__icontains=search)
+        | Q(object_type__in=USER_OBJECT_TYPES, object_id__in=users)
+        | Q(object_type='Order', object_id__in=orders)
+    )
+    if search.isdigit():
+        condition |= Q(object_id=int(search))
+    return condition
+
+
+def search_matcher(search):
+    """与 search_filter 条件相同的匹配函数，用于归档中的日志字典"""
+    from accounts.models import User
+    from .models import Order
+
+    search = search.lower()
+    user_ids = set(User.objects.filter(username__icontains=search).values_list('id', flat=True))
+    order_ids = set(Order.objects.filter(order_number__icontains=search).values_list('id', flat=True))
+    object_id = int(search) if search.isdigit() else None
+
+    def matches(data):
+        return (
+            search in (data['ip_address'] or '').lower()
+            or data['user_id'] in user_ids
+            or (data['object_type'] in USER_OBJECT_TYPES and data['object_id'] in user_ids)
+            or (data['object_type'] == 'Order' and data['object_id'] in order_ids)
+            or (object_id is not None and data['object_id'] == object_id)
+        )
+    return matches
+
+
+_LEGACY_PATTERNS = {
+    ('Order', 'update'): re.compile(r'状态从(?P<from>.+?)更新为(?P<to>.+)$'),
+    ('SalaryApplication', 'create'): re.compile(r'申请金额：(?P<amount>[\d.]+)元'),
+    ('Backup', 'create'): re.compile(r'数据备份：(?P<file>.+)$'),
+    ('Database', 'update'): re.compile(r'从备份文件(?P<file>.+)恢复了数据'),
+}
+
+
+def convert_legacy(data):
+    """
+    将旧格式的日志字段（字符串object_id、object_name、description）转换为结构化字段。
+
+    用于数据迁移，以及读取旧格式的预写文件和归档文件。
+    """
+    data = dict(data)
+    object_name = data.pop('object_name', '') or ''
+    description = data.pop('description', '') or ''
+    object_type, action = data.get('object_type'), data.get('action')
+
+    object_id = str(data.get('object_id') or '')
+    data['object_id'] = int(object_id) if object_id.isdigit() and int(object_id) else None
+
+    params = {}
+    pattern = _LEGACY_PATTERNS.get((object_type, action))
+    match = pattern.search(description) if pattern else None
+    if match:
+        params.update(match.groupdict())
+        if object_type == 'Order':
+            codes = {label: code for code, label in _order_status_labels().items()}
+            params = {key: codes.get(value, value) for key, value in params.items()}
+    if object_type == 'Order' and action == 'create' and '批量导入' in description:
+        params['via'] = 'import'
+    if object_type == 'SalaryApplication' and action in ('approve', 'reject') and '批量' in description:
+        params['via'] = 'bulk'
+    if action == 'delete':
+        # 被删除对象无法在显示时查询，保留名称
+        params['name'] = object_name
+    if (object_type, action) not in MESSAGES:
+        params['text'] = description
+    data['params'] = params
+    return data
+
+
+def _target_name(log):
+    name = getattr(log, '_target_name', None)
+    if name is None:
+        name = (log.params or {}).get('name', '')
+    if not name and log.object_id and log.object_type != 'SalaryApplication':
+        # 关联对象已删除时只显示ID（工资申请的关联名称是教师，不能用申请ID代替）
+        name = f'#{log.object_id}'
+    return name
+
+
+def _order_status_labels():
+    from .models import Order
+    return dict(Order.STATUS_CHOICES)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from orders import log_archive
+
+
+class Command(BaseCommand):
+    help = '将热数据范围之前的操作日志按月归档为压缩文件，并从数据库中删除'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-months', type=int, help='数据库中保留的月份数（含当月），默认 OPERATION_LOG_HOT_MONTHS')
+
+    def handle(self, *args, **options):
+        keep_months = options['keep_months']
+        if keep_months is not None and keep_months < 1:
+            raise CommandError('--keep-months 至少为1')
+
+        archived = log_archive.archive_old_logs(keep_months)
+        if not archived:
+            self.stdout.write('没有需要归档的操作日志')
+            return
+
+        for month, count in archived:
+            self.stdout.write(f'{month:%Y-%m}：归档 {count} 条')
+        self.stdout.write(self.style.SUCCESS(
+            f'归档完成，共 {sum(count for _, count in archived)} 条，归档目录：{log_archive.archive_dir()}'
+        ))
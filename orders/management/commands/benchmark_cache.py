@@ -0,0 +1,100 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from class_os.sqlite_cache import SQLiteCache
+
+# 模拟视图缓存中的一页数据
+SAMPLE_VALUE = [{'id': i, 'order_number': f'ORD20250101{i:06d}', 'name': f'课程{i}', 'amount': i * 100} for i in range(20)]
+
+
+def _incr_worker(path, key, count):
+    cache = SQLiteCache(path, {})
+    for _ in range(count):
+        cache.incr(key)
+
+
+class Command(BaseCommand):
+    help = '比较 SQLiteCache 与 LocMemCache、FileBasedCache 的读写性能，并检查多进程并发incr的正确性'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000, help='每项操作的执行次数（默认2000）')
+        parser.add_argument('--processes', type=int, default=4, help='并发incr测试的进程数（默认4）')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        with tempfile.TemporaryDirectory() as directory:
+            backends = [
+                ('LocMemCache', LocMemCache('benchmark', {'OPTIONS': {'MAX_ENTRIES': iterations * 2}})),
+                ('FileBasedCache', FileBasedCache(os.path.join(directory, 'files'), {
+                    'OPTIONS': {'MAX_ENTRIES': iterations * 2}
+                })),
+                ('SQLiteCache', SQLiteCache(os.path.join(directory, 'cache.sqlite3'), {
+                    'OPTIONS': {'MAX_ENTRIES': iterations * 2}
+                })),
+            ]
+
+            self.stdout.write(f'{"后端":<16}{"set":>10}{"get":>10}{"get_many(20)":>14}{"incr":>10}  （微秒/次）')
+            for name, cache in backends:
+                timings = self.measure(cache, iterations)
+                self.stdout.write(f'{name:<16}' + ''.join(
+                    f'{timings[operation]:>{width}.1f}'
+                    for operation, width in (('set', 10), ('get', 10), ('get_many', 14), ('incr', 10))
+                ))
+
+            self.check_concurrent_incr(os.path.join(directory, 'concurrent.sqlite3'), options['processes'], iterations)
+
+    def measure(self, cache, iterations):
+        keys = [f'benchmark:{i}' for i in range(iterations)]
+        timings = {}
+
+        start = time.perf_counter()
+        for key in keys:
+            cache.set(key, SAMPLE_VALUE)
+        timings['set'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for key in keys:
+            cache.get(key)
+        timings['get'] = time.perf_counter() - start
+
+        batches = [keys[i:i + 20] for i in range(0, iterations, 20)]
+        start = time.perf_counter()
+        for batch in batches:
+            cache.get_many(batch)
+        timings['get_many'] = (time.perf_counter() - start) * iterations / max(len(batches), 1)
+
+        cache.set('benchmark:counter', 0, None)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            cache.incr('benchmark:counter')
+        timings['incr'] = time.perf_counter() - start
+
+        cache.clear()
+        return {operation: seconds / iterations * 1e6 for operation, seconds in timings.items()}
+
+    def check_concurrent_incr(self, path, processes, iterations):
+        """多个进程同时递增同一个键，结果应等于递增总次数"""
+        cache = SQLiteCache(path, {})
+        cache.set('counter', 0, None)
+        # fork方式会复制父进程的连接，spawn保证每个进程独立打开数据库
+        context = multiprocessing.get_context('spawn')
+        workers = [context.Process(target=_incr_worker, args=(path, 'counter', iterations)) for _ in range(processes)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+
+        expected, actual = processes * iterations, cache.get('counter')
+        message = f'{processes}个进程并发incr {expected} 次，结果 {actual}，耗时 {elapsed:.2f} 秒'
+        if actual == expected:
+            self.stdout.write(self.style.SUCCESS(message))
+        else:
+            self.stdout.write(self.style.ERROR(message))
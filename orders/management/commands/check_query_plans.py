@@ -0,0 +1,93 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.models import User
+from orders.models import Order, SalaryApplication, OperationLog
+from orders.pagination import DEFAULT_PAGE_SIZE
+
+# SQLite：SCAN 表名 且未使用索引；PostgreSQL：Seq Scan
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN (\w+)\s*$', re.MULTILINE)
+# SQLite：按索引顺序遍历整张表（只用于排序，未用于筛选）
+SQLITE_INDEX_SCAN = re.compile(r'\bSCAN (\w+) USING (?:COVERING )?INDEX \w+\s*$', re.MULTILINE)
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def view_querysets(teacher_id):
+    """各列表视图实际执行的查询（与视图中的筛选和排序保持一致）"""
+    page = DEFAULT_PAGE_SIZE + 1
+    order_keyset = ('-created_at', '-id')
+    return [
+        ('admin_order_list', Order.objects.order_by(*order_keyset)[:page]),
+        ('admin_order_list?status', Order.objects.filter(status='pending').order_by(*order_keyset)[:page]),
+        ('teacher_order_list', Order.objects.filter(teacher_id=teacher_id).order_by(*order_keyset)[:page]),
+        ('teacher_order_list?status',
+         Order.objects.filter(teacher_id=teacher_id, status='completed').order_by(*order_keyset)[:page]),
+        ('salary_application_list', SalaryApplication.objects.order_by(*order_keyset)[:page]),
+        ('salary_application_list?status',
+         SalaryApplication.objects.filter(status='pending').order_by(*order_keyset)[:page]),
+        ('salary_application_list(teacher)',
+         SalaryApplication.objects.filter(teacher_id=teacher_id).order_by(*order_keyset)[:page]),
+        ('salary_application_list(teacher)?status',
+         SalaryApplication.objects.filter(teacher_id=teacher_id, status='pending').order_by(*order_keyset)[:page]),
+        ('log_list', OperationLog.objects.order_by(*order_keyset)[:page]),
+        ('log_list?action', OperationLog.objects.filter(action='login').order_by(*order_keyset)[:page]),
+        ('log_list?user', OperationLog.objects.filter(user_id=teacher_id).order_by(*order_keyset)[:page]),
+        ('log_list?start_date',
+         OperationLog.objects.filter(created_at__gte=timezone.now()).order_by(*order_keyset)[:page]),
+        ('dashboard:latest_orders', Order.objects.order_by('-created_at')[:5]),
+        ('dashboard:pending_applications', SalaryApplication.objects.filter(status='pending').order_by('-created_at')[:5]),
+        ('dashboard:my_orders', Order.objects.filter(teacher_id=teacher_id).order_by('-created_at')[:5]),
+        ('dashboard:my_applications',
+         SalaryApplication.objects.filter(teacher_id=teacher_id).order_by('-created_at')[:5]),
+    ]
+
+
+def full_scans(queryset, plan):
+    """
+    执行计划中全表扫描的表名。
+
+    SQLite上 SCAN ... USING INDEX 只是按排序索引遍历：有 LIMIT 时取够条数即停止，
+    但查询带有筛选条件且不限条数时会读完整张表，同样视为全表扫描。
+    """
+    if connection.vendor == 'postgresql':
+        return POSTGRES_FULL_SCAN.findall(plan)
+    scans = SQLITE_FULL_SCAN.findall(plan)
+    if queryset.query.where and queryset.query.high_mark is None:
+        scans += SQLITE_INDEX_SCAN.findall(plan)
+    return scans
+
+
+class Command(BaseCommand):
+    help = '对各列表视图的查询执行EXPLAIN，若存在全表扫描则失败'
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'暂不支持的数据库：{connection.vendor}')
+
+        teacher = User.objects.filter(role='teacher').only('id').first()
+        teacher_id = teacher.id if teacher else 0
+
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # 小表上规划器倾向于顺序扫描，关闭后可检验是否存在可用索引
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for name, queryset in view_querysets(teacher_id):
+                plan = queryset.explain()
+                scans = full_scans(queryset, plan)
+                if scans:
+                    tables = ', '.join(sorted(set(scans)))
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f'[全表扫描] {name}: {tables}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'[OK] {name}'))
+                if scans or options['verbosity'] > 1:
+                    self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f'{len(failures)} 个查询存在全表扫描：{", ".join(failures)}')
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from orders import thumbnails
+from orders.models import SalaryApplication
+
+
+class Command(BaseCommand):
+    help = '为尚未生成缩略图的证明材料补生成缩略图'
+
+    def handle(self, *args, **options):
+        names = (
+            SalaryApplication.objects.exclude(proof_file='')
+            .order_by()
+            .values_list('proof_file', flat=True)
+            .distinct()
+            .iterator()
+        )
+
+        generated = skipped = 0
+        for name in names:
+            try:
+                if thumbnails.generate(name):
+                    generated += 1
+                else:
+                    skipped += 1
+            except OSError as e:
+                skipped += 1
+                self.stderr.write(f'{name}：{e}')
+
+        self.stdout.write(self.style.SUCCESS(f'缩略图处理完成：{generated} 个可用，{skipped} 个无法生成'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from orders.importer import import_orders
+
+
+class Command(BaseCommand):
+    help = '从CSV文件批量导入订单'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help='CSV文件路径')
+        parser.add_argument('--user', required=True, help='记为订单创建人的管理员用户名')
+
+    def handle(self, *args, **options):
+        try:
+            created_by = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'用户不存在：{options["user"]}')
+        if not created_by.is_admin:
+            raise CommandError('创建人必须是管理员')
+
+        try:
+            with open(options['csv_path'], 'rb') as file:
+                result = import_orders(file, created_by, ip_address='127.0.0.1')
+        except OSError as e:
+            raise CommandError(f'无法读取文件：{e}')
+
+        if not result.ok:
+            for line_number, message in result.errors:
+                self.stderr.write(f'第{line_number}行：{message}')
+            raise CommandError(f'共{len(result.errors)}行数据有误，未导入任何订单')
+
+        self.stdout.write(self.style.SUCCESS(f'成功导入{len(result.orders)}个订单'))
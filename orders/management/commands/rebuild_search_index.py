@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from orders import search
+
+
+class Command(BaseCommand):
+    help = '根据订单表重建订单检索索引（SQLite FTS5）'
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'postgresql':
+            self.stdout.write('PostgreSQL使用pg_trgm索引，由数据库自动维护，无需重建')
+            return
+
+        if not search.fts_enabled():
+            self.stderr.write('检索索引表不存在，请先执行 migrate（需要SQLite 3.34+ 且支持FTS5）')
+            return
+
+        with transaction.atomic():
+            count = search.rebuild_index()
+
+        self.stdout.write(self.style.SUCCESS(f'检索索引重建完成，共 {count} 条订单'))
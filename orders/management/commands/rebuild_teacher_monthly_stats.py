@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from orders.models import TeacherMonthlyStats
+
+
+class Command(BaseCommand):
+    help = '根据订单和工资申请表重建教师月度统计'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teacher', action='append', help='只重建指定教师（用户名，可重复）')
+
+    def handle(self, *args, **options):
+        teacher_ids = None
+        if options['teacher']:
+            teachers = dict(
+                User.objects.filter(username__in=options['teacher'], role='teacher').values_list('username', 'id')
+            )
+            missing = set(options['teacher']) - set(teachers)
+            if missing:
+                raise CommandError(f'教师不存在：{"、".join(sorted(missing))}')
+            teacher_ids = list(teachers.values())
+
+        count = TeacherMonthlyStats.rebuild(teacher_ids)
+        self.stdout.write(self.style.SUCCESS(f'教师月度统计重建完成，共 {count} 行'))
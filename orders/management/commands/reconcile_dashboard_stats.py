@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from orders.models import DashboardStats
+
+
+class Command(BaseCommand):
+    help = '重新计算仪表盘统计计数，修正增量维护产生的偏差'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            current = DashboardStats.objects.select_for_update().filter(pk=DashboardStats.SINGLETON_ID).first()
+            stats = DashboardStats.reconcile()
+
+        drift = []
+        for field in ('total_teachers', 'total_orders', 'pending_applications', 'approved_amount'):
+            old_value = getattr(current, field) if current else None
+            new_value = getattr(stats, field)
+            if old_value != new_value:
+                drift.append(f'{DashboardStats._meta.get_field(field).verbose_name}：{old_value} -> {new_value}')
+
+        if drift:
+            for line in drift:
+                self.stdout.write(self.style.WARNING(line))
+            self.stdout.write(self.style.SUCCESS(f'已修正 {len(drift)} 项统计'))
+        else:
+            self.stdout.write(self.style.SUCCESS('统计计数无偏差'))
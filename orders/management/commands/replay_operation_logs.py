@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from orders import oplog
+
+
+class Command(BaseCommand):
+    help = '补写已退出进程遗留在预写文件中的操作日志'
+
+    def handle(self, *args, **options):
+        count = oplog.replay_orphaned()
+        self.stdout.write(self.style.SUCCESS(f'已补写 {count} 条操作日志'))
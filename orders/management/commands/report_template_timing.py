@@ -0,0 +1,65 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.test import RequestFactory
+
+from accounts.models import User
+from class_os.template_warmup import template_names
+
+
+class Command(BaseCommand):
+    help = '统计各模板的编译耗时，以及清空模板缓存后首次渲染与再次渲染的耗时'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='渲染时使用的用户（用户名），默认为匿名用户')
+
+    def handle(self, *args, **options):
+        user = AnonymousUser()
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'用户不存在：{options["user"]}')
+
+        backend = engines['django']
+        engine = backend.engine
+        request = RequestFactory().get('/')
+        request.user = user
+        request.session = {}
+        request._messages = FallbackStorage(request)
+
+        self.stdout.write(f'{"模板":<48}{"编译":>10}{"首次渲染":>10}{"再次渲染":>10}  （毫秒）')
+        total_compile = total_cold = total_warm = 0
+        for name in template_names(engine):
+            origin = engine.find_template(name)[1]
+            source = origin.loader.get_contents(origin)
+
+            start = time.perf_counter()
+            engine.from_string(source)
+            compile_time = time.perf_counter() - start
+
+            # 清空缓存加载器，首次渲染包含解析本模板及其父模板、被包含模板的时间
+            for loader in engine.template_loaders:
+                if hasattr(loader, 'reset'):
+                    loader.reset()
+            try:
+                cold = self.render(backend, name, request)
+                warm = self.render(backend, name, request)
+            except Exception as error:
+                # 缺少视图上下文时部分模板无法渲染（如 url 标签缺少参数），只报告编译耗时
+                self.stdout.write(f'{name:<48}{compile_time * 1000:>10.2f}{"-":>10}{"-":>10}  {type(error).__name__}')
+                total_compile += compile_time
+                continue
+            total_compile, total_cold, total_warm = total_compile + compile_time, total_cold + cold, total_warm + warm
+            self.stdout.write(f'{name:<48}{compile_time * 1000:>10.2f}{cold * 1000:>10.2f}{warm * 1000:>10.2f}')
+
+        self.stdout.write(
+            f'{"合计":<48}{total_compile * 1000:>10.2f}{total_cold * 1000:>10.2f}{total_warm * 1000:>10.2f}'
+        )
+
+    def render(self, backend, name, request):
+        start = time.perf_counter()
+        backend.get_template(name).render({}, request)
+        return time.perf_counter() - start
@@ -0,0 +1,112 @@
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_etags, quote_etag
+
+# 分块读取大小
+CHUNK_SIZE = 64 * 1024
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def send_file(request, path, absolute_path):
+    """
+    输出受保护的媒体文件（调用前须已完成权限检查）。
+
+    配置了前端服务器时只返回内部重定向头，由Nginx（X-Accel-Redirect）或Apache/lighttpd（X-Sendfile）
+    直接传输文件；否则由Django分块输出，支持单区间Range请求和If-None-Match协商缓存。
+
+    内部重定向头中的路径经过URL编码：非ASCII的头会被Django按RFC 2047编码，前端服务器无法据此找到文件。
+    """
+    server = getattr(settings, 'PROTECTED_MEDIA_SERVER', None)
+    content_type = mimetypes.guess_type(absolute_path)[0] or 'application/octet-stream'
+
+    if server == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        internal_url = getattr(settings, 'PROTECTED_MEDIA_INTERNAL_URL', '/protected-media/')
+        response['X-Accel-Redirect'] = quote(posixpath.join(internal_url, path))
+        return response
+    if server == 'sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = quote(absolute_path)
+        return response
+
+    stat = os.stat(absolute_path)
+    etag = quote_etag(f'{stat.st_size:x}-{int(stat.st_mtime):x}')
+
+    if _etag_matches(etag, request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    byte_range = _parse_range(request.headers.get('Range'), stat.st_size)
+    if byte_range is None:
+        response = FileResponse(open(absolute_path, 'rb'), content_type=content_type)
+    elif byte_range == 'invalid':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read_range(absolute_path, start, end), status=206, content_type=content_type
+        )
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    # 见 class_os.middleware.GZipMiddleware
+    response.gzip_exempt = True
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = 'private, max-age=3600'
+    return response
+
+
+def _etag_matches(etag, header):
+    """If-None-Match 按弱比较匹配（忽略 W/ 前缀）"""
+    tags = parse_etags(header)
+    return '*' in tags or _strip_weak(etag) in {_strip_weak(tag) for tag in tags}
+
+
+def _strip_weak(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def _parse_range(header, size):
+    """解析单区间Range头，返回 (start, end)；无Range或多区间返回None，越界返回'invalid'"""
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if start == '':
+        # 后缀区间：bytes=-500 表示最后500字节
+        if end == '' or int(end) == 0:
+            return 'invalid'
+        start = max(size - int(end), 0)
+        end = size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return 'invalid'
+    return start, end
+
+
+def _read_range(absolute_path, start, end):
+    with open(absolute_path, 'rb') as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS orders_order_fts USING fts5("
+                "order_number, name, teacher_username, tokenize='trigram')"
+            )
+        except OperationalError:
+            # SQLite未编译FTS5或版本低于3.34（不支持trigram），检索退回LIKE
+            return
+        schema_editor.execute(
+            'INSERT INTO orders_order_fts (rowid, order_number, name, teacher_username) '
+            'SELECT o.id, o.order_number, o.name, u.username '
+            'FROM orders_order o INNER JOIN accounts_user u ON o.teacher_id = u.id'
+        )
+    elif connection.vendor == 'postgresql':
+        # icontains在PostgreSQL上生成 UPPER(col::text) LIKE UPPER(%s)，索引需建立在相同表达式上
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for index_name, table, column in (
+            ('orders_order_number_trgm', 'orders_order', 'order_number'),
+            ('orders_order_name_trgm', 'orders_order', 'name'),
+            ('accounts_user_username_trgm', 'accounts_user', 'username'),
+        ):
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {index_name} ON {table} '
+                f'USING gin (UPPER("{column}"::text) gin_trgm_ops)'
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS orders_order_fts')
+    elif connection.vendor == 'postgresql':
+        for index_name in ('orders_order_number_trgm', 'orders_order_name_trgm', 'accounts_user_username_trgm'):
+            schema_editor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_remove_salaryapplication_review_note_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
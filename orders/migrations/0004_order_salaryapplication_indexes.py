@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at'], name='order_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['teacher', 'created_at'], name='order_teacher_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['teacher', 'status', 'created_at'], name='order_tch_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salaryapplication',
+            index=models.Index(fields=['created_at'], name='app_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salaryapplication',
+            index=models.Index(fields=['status', 'created_at'], name='app_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salaryapplication',
+            index=models.Index(fields=['teacher', 'created_at'], name='app_teacher_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salaryapplication',
+            index=models.Index(fields=['teacher', 'status', 'created_at'], name='app_tch_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:15
+
+from django.db import migrations, models
+from django.db.models import Max
+from django.db.models.functions import Substr
+
+
+def seed_sequences(apps, schema_editor):
+    # 根据已有编号初始化各前缀的计数器，避免与历史编号冲突
+    NumberSequence = apps.get_model('orders', 'NumberSequence')
+    Order = apps.get_model('orders', 'Order')
+    SalaryApplication = apps.get_model('orders', 'SalaryApplication')
+
+    values = {}
+    for model, field in ((Order, 'order_number'), (SalaryApplication, 'application_number')):
+        rows = (
+            model.objects.exclude(**{f'{field}__isnull': True})
+            .annotate(prefix=Substr(field, 1, 11))
+            .values('prefix')
+            .annotate(last=Max(field))
+        )
+        for row in rows:
+            try:
+                values[row['prefix']] = max(values.get(row['prefix'], 0), int(row['last'][-6:]))
+            except (TypeError, ValueError):
+                continue
+
+    NumberSequence.objects.bulk_create([
+        NumberSequence(name=prefix, value=value) for prefix, value in values.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_salaryapplication_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='序列名称')),
+                ('value', models.BigIntegerField(default=0, verbose_name='当前值')),
+            ],
+            options={
+                'verbose_name': '编号序列',
+                'verbose_name_plural': '编号序列管理',
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_active_application(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    SalaryApplication = apps.get_model('orders', 'SalaryApplication')
+    active = SalaryApplication.objects.filter(order_id=models.OuterRef('pk'), status__in=['pending', 'approved'])
+    Order.objects.update(has_active_application=models.Exists(active))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_numbersequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='has_active_application',
+            field=models.BooleanField(default=False, verbose_name='存在有效工资申请'),
+        ),
+        migrations.RunPython(backfill_active_application, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('has_active_application', False)), fields=['teacher', 'status'], name='order_eligible_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='salaryapplication',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'approved'])), fields=('order',), name='unique_active_application_per_order'),
+        ),
+    ]
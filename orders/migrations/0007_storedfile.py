@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:17
+
+import orders.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_has_active_application'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='存储路径')),
+                ('sha256', models.CharField(max_length=64, verbose_name='SHA-256')),
+                ('size', models.BigIntegerField(verbose_name='文件大小')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='引用次数')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': '存储文件',
+                'verbose_name_plural': '存储文件管理',
+            },
+        ),
+        migrations.AlterField(
+            model_name='salaryapplication',
+            name='proof_file',
+            field=models.FileField(storage=orders.storage.ContentAddressedStorage(), upload_to='proofs/', verbose_name='证明材料'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_storedfile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_teachers', models.IntegerField(default=0, verbose_name='教师总数')),
+                ('total_orders', models.IntegerField(default=0, verbose_name='订单总数')),
+                ('pending_applications', models.IntegerField(default=0, verbose_name='待审核申请数')),
+                ('approved_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='已通过申请总金额')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '仪表盘统计',
+                'verbose_name_plural': '仪表盘统计',
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, TruncMonth
+
+
+def backfill_monthly_stats(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    SalaryApplication = apps.get_model('orders', 'SalaryApplication')
+    TeacherMonthlyStats = apps.get_model('orders', 'TeacherMonthlyStats')
+
+    completed = models.Q(status='completed')
+    order_rows = (
+        Order.objects.order_by()
+        .values('teacher_id', month=TruncMonth('created_at', output_field=models.DateField()))
+        .annotate(
+            order_count=models.Count('id'),
+            completed_orders=models.Count('id', filter=completed),
+            completed_hours=models.Sum('total_hours', filter=completed, default=0),
+            completed_amount=models.Sum('total_amount', filter=completed, default=0),
+        )
+    )
+    application_rows = (
+        SalaryApplication.objects.filter(status='approved').order_by()
+        .values('teacher_id', month=TruncMonth(
+            Coalesce('approved_at', 'created_at'), output_field=models.DateField()
+        ))
+        .annotate(approved_applications=models.Count('id'), approved_amount=models.Sum('apply_amount'))
+    )
+
+    stats = {}
+    for row in list(order_rows) + list(application_rows):
+        key = (row.pop('teacher_id'), row.pop('month'))
+        stats.setdefault(key, {}).update(row)
+    TeacherMonthlyStats.objects.bulk_create([
+        TeacherMonthlyStats(teacher_id=teacher_id, month=month, **values)
+        for (teacher_id, month), values in stats.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_dashboardstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeacherMonthlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='月份')),
+                ('order_count', models.IntegerField(default=0, verbose_name='订单数')),
+                ('completed_orders', models.IntegerField(default=0, verbose_name='已完成订单数')),
+                ('completed_hours', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='已完成课时')),
+                ('completed_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='已完成订单金额')),
+                ('approved_applications', models.IntegerField(default=0, verbose_name='已通过申请数')),
+                ('approved_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='已通过工资金额')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_stats', to=settings.AUTH_USER_MODEL, verbose_name='教师')),
+            ],
+            options={
+                'verbose_name': '教师月度统计',
+                'verbose_name_plural': '教师月度统计',
+                'ordering': ['-month'],
+                'constraints': [models.UniqueConstraint(fields=('teacher', 'month'), name='unique_teacher_month')],
+            },
+        ),
+        migrations.RunPython(backfill_monthly_stats, migrations.RunPython.noop),
+    ]
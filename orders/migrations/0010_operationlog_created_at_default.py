@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:26
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_teachermonthlystats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='operationlog',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='操作时间'),
+        ),
+    ]
@@ -0,0 +1,115 @@
+import re
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+# 以下为迁移编写时的转换规则副本，迁移不引用 orders.log_messages，避免其后续修改影响历史迁移
+
+# 有描述模板的 (对象类型, 操作类型)，其余日志的原描述保存在 params['text'] 中
+MESSAGE_KEYS = {
+    ('User', 'login'), ('User', 'logout'),
+    ('Admin', 'create'), ('Admin', 'update'), ('Admin', 'enable'), ('Admin', 'disable'), ('Admin', 'delete'),
+    ('Teacher', 'update'), ('Teacher', 'approve'), ('Teacher', 'enable'), ('Teacher', 'disable'),
+    ('Teacher', 'delete'),
+    ('Order', 'create'), ('Order', 'edit'), ('Order', 'update'),
+    ('SalaryApplication', 'create'), ('SalaryApplication', 'approve'), ('SalaryApplication', 'reject'),
+    ('SalaryApplication', 'withdraw'),
+    ('Backup', 'create'), ('Database', 'update'),
+}
+
+LEGACY_PATTERNS = {
+    ('Order', 'update'): re.compile(r'状态从(?P<from>.+?)更新为(?P<to>.+)$'),
+    ('SalaryApplication', 'create'): re.compile(r'申请金额：(?P<amount>[\d.]+)元'),
+    ('Backup', 'create'): re.compile(r'数据备份：(?P<file>.+)$'),
+    ('Database', 'update'): re.compile(r'从备份文件(?P<file>.+)恢复了数据'),
+}
+
+# 订单状态显示名称 -> 状态代码
+ORDER_STATUS_CODES = {'待开课': 'pending', '进行中': 'ongoing', '已完成': 'completed'}
+
+
+def convert_legacy(log):
+    """将旧格式的 object_id、object_name、description 转换为 (对象ID, params)"""
+    object_type, action = log.object_type, log.action
+    description = log.description or ''
+
+    object_id = str(log.object_id or '')
+    object_pk = int(object_id) if object_id.isdigit() and int(object_id) else None
+
+    params = {}
+    pattern = LEGACY_PATTERNS.get((object_type, action))
+    match = pattern.search(description) if pattern else None
+    if match:
+        params.update(match.groupdict())
+        if object_type == 'Order':
+            params = {key: ORDER_STATUS_CODES.get(value, value) for key, value in params.items()}
+    if object_type == 'Order' and action == 'create' and '批量导入' in description:
+        params['via'] = 'import'
+    if object_type == 'SalaryApplication' and action in ('approve', 'reject') and '批量' in description:
+        params['via'] = 'bulk'
+    if action == 'delete':
+        params['name'] = log.object_name or ''
+    if (object_type, action) not in MESSAGE_KEYS:
+        params['text'] = description
+    return object_pk, params
+
+
+def convert_descriptions(apps, schema_editor):
+    OperationLog = apps.get_model('orders', 'OperationLog')
+    batch = []
+    for log in OperationLog.objects.order_by('id').iterator(chunk_size=BATCH_SIZE):
+        log.object_pk, log.params = convert_legacy(log)
+        batch.append(log)
+        if len(batch) >= BATCH_SIZE:
+            OperationLog.objects.bulk_update(batch, ['object_pk', 'params'])
+            batch = []
+    OperationLog.objects.bulk_update(batch, ['object_pk', 'params'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_operationlog_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='operationlog',
+            name='action',
+            field=models.CharField(choices=[('login', '登录'), ('logout', '登出'), ('create', '创建'), ('update', '更新'), ('delete', '删除'), ('approve', '审核通过'), ('reject', '审核拒绝'), ('edit', '编辑'), ('withdraw', '撤回'), ('enable', '启用'), ('disable', '禁用')], max_length=20, verbose_name='操作类型'),
+        ),
+        migrations.AlterField(
+            model_name='operationlog',
+            name='object_type',
+            field=models.CharField(max_length=20, verbose_name='操作对象类型'),
+        ),
+        migrations.AddField(
+            model_name='operationlog',
+            name='params',
+            field=models.JSONField(blank=True, default=dict, verbose_name='操作参数'),
+        ),
+        migrations.AddField(
+            model_name='operationlog',
+            name='object_pk',
+            field=models.PositiveBigIntegerField(blank=True, null=True, verbose_name='操作对象ID'),
+        ),
+        migrations.RunPython(convert_descriptions, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='operationlog',
+            name='description',
+        ),
+        migrations.RemoveField(
+            model_name='operationlog',
+            name='object_name',
+        ),
+        migrations.RemoveField(
+            model_name='operationlog',
+            name='object_id',
+        ),
+        migrations.RenameField(
+            model_name='operationlog',
+            old_name='object_pk',
+            new_name='object_id',
+        ),
+    ]
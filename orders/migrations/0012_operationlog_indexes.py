@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_operationlog_structured'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='operationlog',
+            index=models.Index(fields=['created_at'], name='log_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='operationlog',
+            index=models.Index(fields=['user', 'created_at'], name='log_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='operationlog',
+            index=models.Index(fields=['action', 'created_at'], name='log_action_created_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0012_operationlog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salaryapplication',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='更新时间'),
+            preserve_default=False,
+        ),
+    ]
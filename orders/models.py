@@ -1,6 +1,51 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
+from django.db.models.functions import Coalesce, TruncMonth
 from django.utils import timezone
 from accounts.models import User
+from class_os import view_cache
+from . import log_messages, oplog, search, thumbnails
+from .storage import proof_storage
+
+# 编号序列（计数器表）
+class NumberSequence(models.Model):
+    """
+    按前缀（如 ORD20260101）维护的递增计数器。
+
+    通过对单行执行原子UPDATE分配编号，不再扫描当天已有编号，并发写入也不会产生重复；
+    批量场景可一次预留一段连续编号。
+    """
+    name = models.CharField(max_length=50, unique=True, verbose_name='序列名称')
+    value = models.BigIntegerField(default=0, verbose_name='当前值')
+    
+    class Meta:
+        verbose_name = '编号序列'
+        verbose_name_plural = '编号序列管理'
+    
+    def __str__(self):
+        return f'{self.name} - {self.value}'
+    
+    @classmethod
+    def reserve(cls, name, count=1):
+        """预留count个连续序号，返回第一个序号"""
+        with transaction.atomic():
+            updated = cls.objects.filter(name=name).update(value=F('value') + count)
+            if not updated:
+                try:
+                    # 当天第一个编号：创建计数器行，并发创建时退回到UPDATE
+                    with transaction.atomic():
+                        cls.objects.create(name=name, value=count)
+                    return 1
+                except IntegrityError:
+                    cls.objects.filter(name=name).update(value=F('value') + count)
+            value = cls.objects.filter(name=name).values_list('value', flat=True).get()
+        return value - count + 1
+    
+    @classmethod
+    def next_numbers(cls, prefix, count=1):
+        """生成 前缀 + 6位序号 形式的编号列表"""
+        start = cls.reserve(prefix, count)
+        return [f'{prefix}{sequence:06d}' for sequence in range(start, start + count)]
 
 class Order(models.Model):
     STATUS_CHOICES = (
@@ -27,11 +72,23 @@ class Order(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_orders', verbose_name='创建人')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    # 是否存在待审核或已通过的工资申请（冗余字段，由SalaryApplication维护）
+    has_active_application = models.BooleanField(default=False, verbose_name='存在有效工资申请')
     
     class Meta:
         verbose_name = '订单'
         verbose_name_plural = '订单管理'
         ordering = ['-created_at']
+        indexes = [
+            # 列表页按创建时间倒序翻页
+            models.Index(fields=['created_at'], name='order_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+            models.Index(fields=['teacher', 'created_at'], name='order_teacher_created_idx'),
+            models.Index(fields=['teacher', 'status', 'created_at'], name='order_tch_status_created_idx'),
+            # 可申请工资的订单（工资申请表单的下拉列表）
+            models.Index(fields=['teacher', 'status'], condition=models.Q(has_active_application=False),
+                         name='order_eligible_idx'),
+        ]
     
     def __str__(self):
         return f'{self.order_number} - {self.name}'
@@ -42,15 +99,24 @@ class Order(models.Model):
             self.total_amount = self.unit_price * self.total_hours
         # 生成订单编号（如果没有）
         if not self.order_number:
-            # 生成格式：ORD + 年月日 + 6位随机数
+            # 生成格式：ORD + 年月日 + 6位序号
             prefix = timezone.now().strftime('ORD%Y%m%d')
-            last_order = Order.objects.filter(order_number__startswith=prefix).order_by('-order_number').first()
-            if last_order:
-                sequence = int(last_order.order_number[-6:]) + 1
-            else:
-                sequence = 1
-            self.order_number = f'{prefix}{sequence:06d}'
-        super().save(*args, **kwargs)
+            self.order_number = NumberSequence.next_numbers(prefix)[0]
+        # 订单、检索索引和统计计数在同一事务中写入
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # 同步检索索引
+            search.index_order(self)
+    
+    @classmethod
+    def refresh_application_flags(cls, order_ids):
+        """根据工资申请重新计算订单的 has_active_application 标记"""
+        active = SalaryApplication.objects.filter(
+            order_id=models.OuterRef('pk'), status__in=SalaryApplication.ACTIVE_STATUSES
+        )
+        view_cache.bump(cls)
+        return cls.objects.filter(pk__in=order_ids).update(has_active_application=models.Exists(active))
+
 
 class SalaryApplication(models.Model):
     STATUS_CHOICES = (
@@ -60,11 +126,14 @@ class SalaryApplication(models.Model):
         ('withdrawn', '已撤回'),
     )
     
+    # 占用订单的申请状态：同一订单同时只能有一条
+    ACTIVE_STATUSES = ('pending', 'approved')
+    
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='salary_applications', verbose_name='关联订单')
     application_number = models.CharField(max_length=50, unique=True, null=True, blank=True, verbose_name='申请编号')
     teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='salary_applications', verbose_name='申请教师')
     apply_amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='申请金额')
-    proof_file = models.FileField(upload_to='proofs/', verbose_name='证明材料')
+    proof_file = models.FileField(upload_to='proofs/', storage=proof_storage, verbose_name='证明材料')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='审核状态')
     approved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='approved_applications', verbose_name='审批人')
     remarks = models.TextField(null=True, blank=True, verbose_name='备注')
@@ -73,15 +142,32 @@ class SalaryApplication(models.Model):
     approved_at = models.DateTimeField(null=True, blank=True, verbose_name='审批时间')
     withdrawn_at = models.DateTimeField(null=True, blank=True, verbose_name='撤回时间')
     rejected_at = models.DateTimeField(null=True, blank=True, verbose_name='拒绝时间')
+    # 列表行缓存以此作为版本
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
     
     class Meta:
         verbose_name = '工资申请'
         verbose_name_plural = '工资申请管理'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='app_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='app_status_created_idx'),
+            models.Index(fields=['teacher', 'created_at'], name='app_teacher_created_idx'),
+            models.Index(fields=['teacher', 'status', 'created_at'], name='app_tch_status_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['order'], condition=models.Q(status__in=['pending', 'approved']),
+                                    name='unique_active_application_per_order'),
+        ]
     
     def __str__(self):
         return f'{self.application_number or "未生成编号"} - {self.order.order_number} - {self.teacher.username}'
     
+    @property
+    def proof_thumbnail_url(self):
+        """证明材料缩略图URL（后台生成完成前为None）"""
+        return thumbnails.thumbnail_url(self.proof_file.name)
+    
     def save(self, *args, **kwargs):
         # 如果是首次保存，自动设置教师为订单的教师
         if not self.pk:
@@ -89,16 +175,232 @@ class SalaryApplication(models.Model):
         
         # 生成申请编号（如果没有）
         if not self.application_number:
-            # 生成格式：APP + 年月日 + 6位随机数
+            # 生成格式：APP + 年月日 + 6位序号
             prefix = timezone.now().strftime('APP%Y%m%d')
-            last_application = SalaryApplication.objects.filter(application_number__startswith=prefix).order_by('-application_number').first()
-            if last_application:
-                sequence = int(last_application.application_number[-6:]) + 1
-            else:
-                sequence = 1
-            self.application_number = f'{prefix}{sequence:06d}'
+            self.application_number = NumberSequence.next_numbers(prefix)[0]
         
-        super().save(*args, **kwargs)
+        # 申请状态与订单的可申请标记在同一事务中更新
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Order.refresh_application_flags([self.order_id])
+
+# 去重存储的文件（按内容寻址，记录引用次数）
+class StoredFile(models.Model):
+    name = models.CharField(max_length=255, unique=True, verbose_name='存储路径')
+    sha256 = models.CharField(max_length=64, verbose_name='SHA-256')
+    size = models.BigIntegerField(verbose_name='文件大小')
+    ref_count = models.PositiveIntegerField(default=0, verbose_name='引用次数')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    
+    class Meta:
+        verbose_name = '存储文件'
+        verbose_name_plural = '存储文件管理'
+    
+    def __str__(self):
+        return f'{self.name}（引用{self.ref_count}次）'
+
+# 仪表盘汇总计数（单行表）
+class DashboardStats(models.Model):
+    """
+    管理员仪表盘的汇总数据，由 orders.signals 随各模型写入增量维护。
+
+    仪表盘只需按主键读取这一行，不再对用户、订单、工资申请表做COUNT/SUM；
+    计数出现偏差时可运行 reconcile_dashboard_stats 命令重新计算。
+    """
+    SINGLETON_ID = 1
+    
+    total_teachers = models.IntegerField(default=0, verbose_name='教师总数')
+    total_orders = models.IntegerField(default=0, verbose_name='订单总数')
+    pending_applications = models.IntegerField(default=0, verbose_name='待审核申请数')
+    approved_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='已通过申请总金额')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        verbose_name = '仪表盘统计'
+        verbose_name_plural = '仪表盘统计'
+    
+    def __str__(self):
+        return f'教师{self.total_teachers} 订单{self.total_orders} 待审核{self.pending_applications}'
+    
+    @classmethod
+    def compute(cls):
+        """从各业务表重新计算统计值"""
+        return {
+            'total_teachers': User.objects.filter(role='teacher').count(),
+            'total_orders': Order.objects.count(),
+            'pending_applications': SalaryApplication.objects.filter(status='pending').count(),
+            'approved_amount': SalaryApplication.objects.filter(status='approved').aggregate(
+                total=models.Sum('apply_amount')
+            )['total'] or 0,
+        }
+    
+    @classmethod
+    def reconcile(cls):
+        """重新计算并覆盖统计行，返回统计行"""
+        stats, _ = cls.objects.update_or_create(pk=cls.SINGLETON_ID, defaults=cls.compute())
+        return stats
+    
+    @classmethod
+    def load(cls):
+        stats = cls.objects.filter(pk=cls.SINGLETON_ID).first()
+        return stats if stats is not None else cls.reconcile()
+    
+    @classmethod
+    def adjust(cls, **deltas):
+        """按增量更新统计值，例如 adjust(total_orders=1, pending_applications=-1)"""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        updated = cls.objects.filter(pk=cls.SINGLETON_ID).update(
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+        if not updated:
+            # 统计行尚未建立：直接全量计算（已包含本次变更）
+            cls.reconcile()
+
+# 教师月度统计（汇总表）
+class TeacherMonthlyStats(models.Model):
+    """
+    按 (教师, 月份) 汇总的课时、订单金额和已通过工资，由 orders.signals 随订单和工资申请的写入增量维护。
+
+    订单计入创建月份，工资申请计入审批月份；教师详情页直接读取本表，不再对历史订单做GROUP BY。
+    出现偏差时可运行 rebuild_teacher_monthly_stats 命令重建。
+    """
+    # 可增量维护的计数字段
+    COUNTER_FIELDS = (
+        'order_count', 'completed_orders', 'completed_hours', 'completed_amount',
+        'approved_applications', 'approved_amount',
+    )
+    
+    teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_stats', verbose_name='教师')
+    month = models.DateField(verbose_name='月份')
+    order_count = models.IntegerField(default=0, verbose_name='订单数')
+    completed_orders = models.IntegerField(default=0, verbose_name='已完成订单数')
+    completed_hours = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name='已完成课时')
+    completed_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='已完成订单金额')
+    approved_applications = models.IntegerField(default=0, verbose_name='已通过申请数')
+    approved_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='已通过工资金额')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        verbose_name = '教师月度统计'
+        verbose_name_plural = '教师月度统计'
+        ordering = ['-month']
+        constraints = [
+            models.UniqueConstraint(fields=['teacher', 'month'], name='unique_teacher_month'),
+        ]
+    
+    def __str__(self):
+        return f'{self.teacher.username} - {self.month:%Y-%m}'
+    
+    @staticmethod
+    def month_of(value):
+        """时间所在月份的第一天（按当前时区）"""
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date().replace(day=1)
+    
+    @classmethod
+    def order_contribution(cls, order):
+        """单个订单对月度统计的贡献：{(教师ID, 月份): {字段: 增量}}"""
+        values = {'order_count': 1}
+        if order.status == 'completed':
+            values.update(completed_orders=1, completed_hours=order.total_hours, completed_amount=order.total_amount)
+        return {(order.teacher_id, cls.month_of(order.created_at)): values}
+    
+    @classmethod
+    def application_contribution(cls, application):
+        """单条工资申请对月度统计的贡献，只有已通过的申请计入"""
+        if application.status != 'approved':
+            return {}
+        month = cls.month_of(application.approved_at or application.created_at)
+        return {(application.teacher_id, month): {
+            'approved_applications': 1, 'approved_amount': application.apply_amount,
+        }}
+    
+    @classmethod
+    def apply(cls, new=(), old=()):
+        """写入贡献差值：sum(new) - sum(old)，每项贡献均为 {(教师ID, 月份): {字段: 值}} 形式"""
+        deltas = {}
+        for contributions, sign in ((new, 1), (old, -1)):
+            for contribution in contributions:
+                for key, values in contribution.items():
+                    row = deltas.setdefault(key, {})
+                    for field, value in values.items():
+                        row[field] = row.get(field, 0) + sign * value
+        for (teacher_id, month), values in deltas.items():
+            cls.adjust(teacher_id, month, **values)
+    
+    @classmethod
+    def adjust(cls, teacher_id, month, **deltas):
+        """按增量更新某位教师某月的统计，统计行不存在且有增量为正时创建"""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        rows = cls.objects.filter(teacher_id=teacher_id, month=month)
+        changes = {field: F(field) + delta for field, delta in deltas.items()}
+        with transaction.atomic():
+            if rows.update(**changes):
+                return
+            if all(delta < 0 for delta in deltas.values()):
+                # 只有减量时不创建统计行：统计行已随教师级联删除（或本就不存在），无需扣减
+                return
+            try:
+                # 该月第一条数据：创建统计行，并发创建时退回到UPDATE
+                with transaction.atomic():
+                    cls.objects.create(teacher_id=teacher_id, month=month, **deltas)
+            except IntegrityError:
+                rows.update(**changes)
+    
+    @classmethod
+    def compute(cls, teacher_ids=None):
+        """从订单和工资申请表重新计算，返回 {(教师ID, 月份): {字段: 值}}"""
+        orders = Order.objects.all()
+        applications = SalaryApplication.objects.filter(status='approved')
+        if teacher_ids is not None:
+            orders = orders.filter(teacher_id__in=teacher_ids)
+            applications = applications.filter(teacher_id__in=teacher_ids)
+        
+        completed = models.Q(status='completed')
+        order_rows = (
+            orders.order_by()
+            .values('teacher_id', month=TruncMonth('created_at', output_field=models.DateField()))
+            .annotate(
+                order_count=models.Count('id'),
+                completed_orders=models.Count('id', filter=completed),
+                completed_hours=models.Sum('total_hours', filter=completed, default=0),
+                completed_amount=models.Sum('total_amount', filter=completed, default=0),
+            )
+        )
+        application_rows = (
+            applications.order_by()
+            .values('teacher_id', month=TruncMonth(
+                Coalesce('approved_at', 'created_at'), output_field=models.DateField()
+            ))
+            .annotate(approved_applications=models.Count('id'), approved_amount=models.Sum('apply_amount'))
+        )
+        
+        result = {}
+        for row in list(order_rows) + list(application_rows):
+            key = (row.pop('teacher_id'), row.pop('month'))
+            result.setdefault(key, {}).update(row)
+        return result
+    
+    @classmethod
+    def rebuild(cls, teacher_ids=None):
+        """重建统计行（可只重建指定教师），返回写入的行数"""
+        rows = [
+            cls(teacher_id=teacher_id, month=month, **values)
+            for (teacher_id, month), values in cls.compute(teacher_ids).items()
+        ]
+        existing = cls.objects.all()
+        if teacher_ids is not None:
+            existing = existing.filter(teacher_id__in=teacher_ids)
+        with transaction.atomic():
+            existing.delete()
+            cls.objects.bulk_create(rows, batch_size=1000)
+            view_cache.bump(cls)
+        return len(rows)
 
 # 操作日志模型
 class OperationLog(models.Model):
@@ -110,21 +412,51 @@ class OperationLog(models.Model):
         ('delete', '删除'),
         ('approve', '审核通过'),
         ('reject', '审核拒绝'),
+        ('edit', '编辑'),
+        ('withdraw', '撤回'),
+        ('enable', '启用'),
+        ('disable', '禁用'),
     )
     
+    # 只保存结构化字段，操作描述在显示时按 log_messages.MESSAGES 中的模板生成
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='logs', verbose_name='操作用户')
     action = models.CharField(max_length=20, choices=ACTION_CHOICES, verbose_name='操作类型')
-    object_type = models.CharField(max_length=100, verbose_name='操作对象类型')
-    object_id = models.CharField(max_length=100, verbose_name='操作对象ID')
-    object_name = models.CharField(max_length=200, verbose_name='操作对象名称')
+    object_type = models.CharField(max_length=20, verbose_name='操作对象类型')
+    object_id = models.PositiveBigIntegerField(null=True, blank=True, verbose_name='操作对象ID')
+    params = models.JSONField(default=dict, blank=True, verbose_name='操作参数')
     ip_address = models.CharField(max_length=50, verbose_name='IP地址')
-    description = models.TextField(verbose_name='操作描述')
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name='操作时间')
+    # 由调用方在记录时赋值，异步批量写入时保留实际操作时间
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='操作时间')
     
     class Meta:
         verbose_name = '操作日志'
         verbose_name_plural = '操作日志管理'
         ordering = ['-created_at']
+        # 日志列表按 (created_at, id) 游标分页，常用筛选为操作用户和操作类型
+        indexes = [
+            models.Index(fields=['created_at'], name='log_created_idx'),
+            models.Index(fields=['user', 'created_at'], name='log_user_created_idx'),
+            models.Index(fields=['action', 'created_at'], name='log_action_created_idx'),
+        ]
     
     def __str__(self):
         return f'{self.user} - {self.get_action_display()} - {self.object_name}'
+    
+    @property
+    def message(self):
+        """操作描述"""
+        return log_messages.render(self)
+    
+    @property
+    def object_name(self):
+        return log_messages.object_name(self)
+    
+    @classmethod
+    def prepare_display(cls, logs):
+        """批量查询日志关联对象的名称，渲染日志列表前调用，避免逐条查询"""
+        return log_messages.attach_targets(logs)
+    
+    @classmethod
+    def record(cls, **fields):
+        """记录操作日志（默认由后台线程批量写入，见 orders.oplog），参数与 objects.create 相同"""
+        oplog.record(**fields)
@@ -0,0 +1,245 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from class_os import view_cache
+
+from . import log_messages
+
+logger = logging.getLogger(__name__)
+
+# 预写文件命名：oplog-<进程ID>-<段标识>.jsonl
+SEGMENT_PATTERN = 'oplog-*-*.jsonl'
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def record(**fields):
+    """
+    记录一条操作日志，参数与 OperationLog.objects.create 相同。
+
+    异步模式（默认）下日志在事务提交后追加到本进程的预写文件并放入内存缓冲，由后台线程按条数或时间
+    批量 bulk_create；进程崩溃后预写文件由其他进程或 replay_operation_logs 命令补写。
+    OPERATION_LOG_ASYNC = False 时在当前请求内直接写入（测试使用）。
+    """
+    data = _serialize(fields)
+    if not getattr(settings, 'OPERATION_LOG_ASYNC', True):
+        _write([data])
+        return
+    transaction.on_commit(lambda: _get_writer().submit(data))
+
+
+def flush():
+    """将本进程缓冲中的日志立即写入数据库"""
+    if _writer is not None and _writer.pid == os.getpid():
+        _writer.flush()
+
+
+def replay_orphaned(spool_dir=None):
+    """补写已退出进程遗留的预写文件，返回写入的日志条数"""
+    spool_dir = spool_dir or _spool_dir()
+    count = 0
+    for path in sorted(glob.glob(os.path.join(spool_dir, SEGMENT_PATTERN))):
+        if _process_alive(_segment_pid(path)):
+            continue
+        # 改名为本进程的段文件再处理，多个进程同时补写时只有一个能改名成功
+        claimed = os.path.join(spool_dir, f'oplog-{os.getpid()}-r{time.time_ns()}.jsonl')
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            continue
+        batch = _read_segment(claimed)
+        _write(batch)
+        os.remove(claimed)
+        count += len(batch)
+    return count
+
+
+class LogWriter:
+    """单进程内的日志写入线程，预写文件按批次轮换，写入数据库成功后删除"""
+
+    def __init__(self, spool_dir, batch_size, interval, fsync=False):
+        self.pid = os.getpid()
+        self.spool_dir = spool_dir
+        self.batch_size = batch_size
+        self.interval = interval
+        self.fsync = fsync
+
+        self._condition = threading.Condition()
+        self._commit_lock = threading.Lock()
+        self._pending = []
+        self._segment = None
+        self._segment_file = None
+        self._failed = []
+        self._closed = False
+
+        os.makedirs(spool_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name='operation-log-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, data):
+        line = json.dumps(data, ensure_ascii=False) + '\n'
+        with self._condition:
+            if self._segment_file is None:
+                self._segment = os.path.join(self.spool_dir, f'oplog-{self.pid}-{time.time_ns()}.jsonl')
+                self._segment_file = open(self._segment, 'a', encoding='utf-8')
+            self._segment_file.write(line)
+            self._segment_file.flush()
+            if self.fsync:
+                os.fsync(self._segment_file.fileno())
+            self._pending.append(data)
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def flush(self):
+        with self._condition:
+            batch, segment = self._rotate()
+        self._commit(batch, segment)
+
+    def close(self, timeout=5):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            replay_orphaned(self.spool_dir)
+        except Exception:
+            logger.exception('补写遗留操作日志失败')
+
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closed or len(self._pending) >= self.batch_size, timeout=self.interval
+                )
+                batch, segment = self._rotate()
+                closed = self._closed
+            self._commit(batch, segment)
+            if closed:
+                break
+        connection.close()
+
+    def _rotate(self):
+        """取出当前缓冲并关闭对应的预写文件，之后的日志写入新文件"""
+        batch, segment = self._pending, self._segment
+        if self._segment_file is not None:
+            self._segment_file.close()
+        self._pending, self._segment, self._segment_file = [], None, None
+        return batch, segment
+
+    def _commit(self, batch, segment):
+        with self._commit_lock:
+            # 先重试之前因数据库不可用而失败的批次
+            segments = self._failed + ([(segment, batch)] if segment else [])
+            self._failed = []
+            for index, (path, data) in enumerate(segments):
+                try:
+                    _write(data if data is not None else _read_segment(path))
+                except DatabaseError:
+                    logger.exception('写入操作日志失败，稍后重试：%s', path)
+                    # 已落盘，不必继续占用内存
+                    self._failed = [(failed_path, None) for failed_path, _ in segments[index:]]
+                    break
+                os.remove(path)
+
+
+def _get_writer():
+    global _writer
+    with _writer_lock:
+        # fork出的子进程不能沿用父进程的线程
+        if _writer is None or _writer.pid != os.getpid():
+            _writer = LogWriter(
+                _spool_dir(),
+                batch_size=getattr(settings, 'OPERATION_LOG_BATCH_SIZE', 100),
+                interval=getattr(settings, 'OPERATION_LOG_FLUSH_INTERVAL', 1.0),
+                fsync=getattr(settings, 'OPERATION_LOG_FSYNC', False),
+            )
+    return _writer
+
+
+@atexit.register
+def _close_writer():
+    if _writer is not None and _writer.pid == os.getpid():
+        _writer.close()
+
+
+def _write(batch):
+    from .models import OperationLog
+
+    logs = [OperationLog(**_deserialize(data)) for data in batch]
+    try:
+        with transaction.atomic():
+            OperationLog.objects.bulk_create(logs)
+    except IntegrityError:
+        # 个别记录无法写入（如操作用户已被删除）时逐条写入，用户不存在的记录保留为匿名
+        for data in batch:
+            log = OperationLog(**_deserialize(data))
+            try:
+                with transaction.atomic():
+                    log.save()
+            except IntegrityError:
+                log.user_id = None
+                log.save()
+    # bulk_create不触发信号，使日志列表缓存失效
+    view_cache.bump(OperationLog)
+
+
+def _serialize(fields):
+    user = fields.pop('user', None)
+    created_at = fields.pop('created_at', None) or timezone.now()
+    return {
+        **fields,
+        'user_id': user.pk if user is not None else fields.get('user_id'),
+        'ip_address': fields.get('ip_address') or '',
+        'created_at': created_at.isoformat(),
+    }
+
+
+def _deserialize(data):
+    if 'description' in data:
+        # 升级前写入预写文件的旧格式日志
+        data = log_messages.convert_legacy(data)
+    return {**data, 'created_at': parse_datetime(data['created_at'])}
+
+
+def _read_segment(path):
+    batch = []
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            try:
+                batch.append(json.loads(line))
+            except ValueError:
+                # 进程崩溃时最后一行可能不完整
+                logger.warning('跳过不完整的操作日志：%s', path)
+    return batch
+
+
+def _segment_pid(path):
+    return int(os.path.basename(path).split('-')[1])
+
+
+def _process_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _spool_dir():
+    return str(getattr(settings, 'OPERATION_LOG_SPOOL_DIR', os.path.join(settings.BASE_DIR, 'logs', 'operation_log')))
@@ -0,0 +1,143 @@
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# 每页默认条数
+DEFAULT_PAGE_SIZE = 20
+
+
+def encode_cursor(created_at, pk):
+    """将 (created_at, id) 编码为URL安全的游标字符串"""
+    raw = f'{created_at.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """解析游标字符串，格式错误时返回None"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        created_at_str, pk_str = raw.rsplit('|', 1)
+        created_at = parse_datetime(created_at_str)
+        if created_at is None:
+            return None
+        return created_at, int(pk_str)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        return None
+
+
+class KeysetPage:
+    """游标分页结果，接口尽量与Django的Page保持一致，便于模板使用"""
+
+    def __init__(self, object_list, has_next, has_previous, next_query, previous_query):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_query = next_query
+        self.previous_query = previous_query
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+def keyset_paginate(request, queryset, per_page=DEFAULT_PAGE_SIZE,
+                    date_field='created_at', older=()):
+    """
+    基于 (created_at, id) 的游标分页，按时间倒序。
+
+    与OFFSET分页不同，这里不执行COUNT(*)，每页只取 per_page + 1 条记录判断是否还有下一页，
+    翻页代价与表的总行数无关。翻页链接会保留当前请求的其余查询参数（如search、status）。
+
+    older 为比 queryset 中所有记录都早的附加记录（按时间倒序的列表，如归档日志），
+    翻过 queryset 的最后一页后接着分页。也可以传入返回该列表的函数，只在需要时才调用。
+    """
+    after = decode_cursor(request.GET.get('after'))
+    before = decode_cursor(request.GET.get('before'))
+    limit = per_page + 1
+
+    def key(obj):
+        return getattr(obj, date_field), obj.pk
+
+    def older_rows():
+        nonlocal older
+        if callable(older):
+            older = older()
+        return older
+
+    if before:
+        # 向前翻页：取比游标更新的记录，按正序取出后再反转
+        created_at, pk = before
+        rows = []
+        # older 中的记录都早于 queryset：游标不早于 queryset 中最早的记录时，比游标新的只有 queryset 中的记录
+        if older and not queryset.filter(
+            Q(**{f'{date_field}__lt': created_at}) |
+            Q(**{date_field: created_at, 'id__lte': pk})
+        ).exists():
+            rows = [obj for obj in reversed(older_rows()) if key(obj) > before][:limit]
+        if len(rows) < limit:
+            queryset = queryset.filter(
+                Q(**{f'{date_field}__gt': created_at}) |
+                Q(**{date_field: created_at, 'id__gt': pk})
+            ).order_by(date_field, 'id')
+            rows += list(queryset[:limit - len(rows)])
+    else:
+        if after:
+            created_at, pk = after
+            queryset = queryset.filter(
+                Q(**{f'{date_field}__lt': created_at}) |
+                Q(**{date_field: created_at, 'id__lt': pk})
+            )
+        queryset = queryset.order_by(f'-{date_field}', '-id')
+        rows = list(queryset[:limit])
+        if len(rows) < limit:
+            rows += [obj for obj in older_rows() if after is None or key(obj) < after][:limit - len(rows)]
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if before:
+        rows.reverse()
+        has_next = True
+        has_previous = has_more
+    else:
+        has_next = has_more
+        has_previous = after is not None
+
+    if not rows:
+        has_next = has_previous = False
+
+    next_query = previous_query = ''
+    if has_next:
+        last = rows[-1]
+        next_query = _build_query(request, 'after', encode_cursor(getattr(last, date_field), last.pk))
+    if has_previous:
+        first = rows[0]
+        previous_query = _build_query(request, 'before', encode_cursor(getattr(first, date_field), first.pk))
+
+    return KeysetPage(rows, has_next, has_previous, next_query, previous_query)
+
+
+def _build_query(request, key, cursor):
+    """在保留其他筛选参数的前提下替换游标参数"""
+    params = request.GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
+    params.pop('page', None)
+    params[key] = cursor
+    return params.urlencode()
@@ -0,0 +1,115 @@
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# 订单全文检索索引
+#
+# SQLite：使用FTS5虚拟表（trigram分词器），rowid与订单ID一致，支持任意子串匹配；
+# PostgreSQL：在迁移中为相关列建立pg_trgm的GIN索引，icontains查询可直接命中索引，
+# 因此无需额外的索引表。
+FTS_TABLE = 'orders_order_fts'
+
+# trigram分词器要求查询词至少3个字符，更短的查询退回到LIKE
+MIN_MATCH_LENGTH = 3
+
+# 检索字段 -> Order上的查询路径
+SEARCH_FIELDS = {
+    'order_number': 'order_number',
+    'name': 'name',
+    'teacher_username': 'teacher__username',
+}
+
+_fts_available = None
+
+
+def fts_enabled():
+    """当前数据库是否存在FTS5索引表（仅SQLite）"""
+    global _fts_available
+    if connection.vendor != 'sqlite':
+        return False
+    if _fts_available is None:
+        _fts_available = FTS_TABLE in connection.introspection.table_names()
+    return _fts_available
+
+
+def index_order(order):
+    """写入或更新单个订单的检索记录"""
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [order.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, order_number, name, teacher_username) VALUES (%s, %s, %s, %s)',
+            [order.pk, order.order_number, order.name, order.teacher.username]
+        )
+
+
+def index_orders(orders):
+    """批量写入新订单的检索记录（用于bulk_create之后）"""
+    if not fts_enabled() or not orders:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, order_number, name, teacher_username) VALUES (%s, %s, %s, %s)',
+            [(order.pk, order.order_number, order.name, order.teacher.username) for order in orders]
+        )
+
+
+def remove_order(order_id):
+    """删除单个订单的检索记录"""
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [order_id])
+
+
+def update_teacher_username(teacher_id, username):
+    """教师用户名修改后更新其全部订单的检索记录"""
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {FTS_TABLE} SET teacher_username = %s '
+            'WHERE rowid IN (SELECT id FROM orders_order WHERE teacher_id = %s)',
+            [username, teacher_id]
+        )
+
+
+def rebuild_index():
+    """清空并根据订单表重建检索索引，返回写入的记录数"""
+    if not fts_enabled():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, order_number, name, teacher_username) '
+            'SELECT o.id, o.order_number, o.name, u.username '
+            'FROM orders_order o INNER JOIN accounts_user u ON o.teacher_id = u.id'
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def search_orders(queryset, search, fields=('order_number', 'name', 'teacher_username')):
+    """
+    按关键字筛选订单。
+
+    SQLite上通过FTS5索引取出匹配的订单ID，避免对订单表和教师表做LIKE全表扫描；
+    其他情况（PostgreSQL由trigram索引支撑，或关键字过短）使用icontains组合条件。
+    """
+    if not search:
+        return queryset
+
+    if fts_enabled() and len(search) >= MIN_MATCH_LENGTH:
+        # 整体作为短语匹配，双引号需转义
+        phrase = '"' + search.replace('"', '""') + '"'
+        expression = '{' + ' '.join(fields) + '} : ' + phrase
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [expression]
+        ))
+
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{SEARCH_FIELDS[field]}__icontains': search})
+    return queryset.filter(condition)
@@ -0,0 +1,206 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from accounts.models import TeacherInfo, User
+from class_os import view_cache
+from . import search, thumbnails
+from .models import DashboardStats, Order, SalaryApplication, TeacherMonthlyStats
+from .storage import proof_storage
+
+
+# 仪表盘统计计数的增量维护
+#
+# 工资申请记录加载时保存原始状态和金额，保存/删除时只更新差值。
+# 批量写入（bulk_create/update）不会触发信号，相应视图中直接调用 DashboardStats.adjust。
+
+def _application_contribution(status, amount):
+    """单条工资申请对 (待审核数, 已通过金额) 的贡献"""
+    return (
+        1 if status == 'pending' else 0,
+        (amount or 0) if status == 'approved' else 0,
+    )
+
+
+@receiver(post_init, sender=SalaryApplication)
+def remember_application_state(sender, instance, **kwargs):
+    if not instance.pk:
+        instance._stats_contribution = (0, 0)
+    elif {'status', 'apply_amount'} & instance.get_deferred_fields():
+        # 延迟加载的字段不在此处读取（会产生额外查询），保存时改为全量校正
+        instance._stats_contribution = None
+    else:
+        instance._stats_contribution = _application_contribution(instance.status, instance.apply_amount)
+
+
+@receiver(post_save, sender=SalaryApplication)
+def update_application_stats(sender, instance, **kwargs):
+    new_pending, new_amount = _application_contribution(instance.status, instance.apply_amount)
+    if instance._stats_contribution is None:
+        DashboardStats.reconcile()
+    else:
+        old_pending, old_amount = instance._stats_contribution
+        DashboardStats.adjust(pending_applications=new_pending - old_pending, approved_amount=new_amount - old_amount)
+    instance._stats_contribution = (new_pending, new_amount)
+
+
+@receiver(post_delete, sender=SalaryApplication)
+def remove_application_stats(sender, instance, **kwargs):
+    if instance._stats_contribution is None:
+        DashboardStats.reconcile()
+        return
+    pending, amount = instance._stats_contribution
+    DashboardStats.adjust(pending_applications=-pending, approved_amount=-amount)
+
+
+@receiver(post_save, sender=Order)
+def update_order_stats(sender, instance, created, **kwargs):
+    if created:
+        DashboardStats.adjust(total_orders=1)
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_stats(sender, instance, **kwargs):
+    DashboardStats.adjust(total_orders=-1)
+
+
+@receiver(post_save, sender=User)
+def update_teacher_stats(sender, instance, created, **kwargs):
+    if created and instance.role == 'teacher':
+        DashboardStats.adjust(total_teachers=1)
+
+
+@receiver(post_delete, sender=User)
+def remove_teacher_stats(sender, instance, **kwargs):
+    if instance.role == 'teacher':
+        DashboardStats.adjust(total_teachers=-1)
+
+
+# 教师月度统计的增量维护
+#
+# 与仪表盘统计相同：加载时记录订单/申请对月度统计的贡献，保存/删除时写入差值。
+
+# get_deferred_fields() 返回字段的 attname，外键为 teacher_id
+ORDER_ROLLUP_FIELDS = {'teacher_id', 'status', 'total_hours', 'total_amount', 'created_at'}
+APPLICATION_ROLLUP_FIELDS = {'teacher_id', 'status', 'apply_amount', 'approved_at', 'created_at'}
+
+
+def _remember_rollup(instance, fields, contribution):
+    if not instance.pk:
+        instance._rollup_contribution = {}
+    elif fields & instance.get_deferred_fields():
+        instance._rollup_contribution = None
+    else:
+        instance._rollup_contribution = contribution(instance)
+
+
+def _save_rollup(instance, contribution):
+    new = contribution(instance)
+    if instance._rollup_contribution is None:
+        TeacherMonthlyStats.rebuild(teacher_ids=[instance.teacher_id])
+    else:
+        TeacherMonthlyStats.apply(new=[new], old=[instance._rollup_contribution])
+    instance._rollup_contribution = new
+
+
+def _delete_rollup(instance):
+    if instance._rollup_contribution is None:
+        # 记录已删除，延迟加载的教师无法再读取，只能全量重建
+        deferred = 'teacher_id' in instance.get_deferred_fields()
+        TeacherMonthlyStats.rebuild(teacher_ids=None if deferred else [instance.teacher_id])
+    else:
+        TeacherMonthlyStats.apply(old=[instance._rollup_contribution])
+
+
+@receiver(post_init, sender=Order)
+def remember_order_rollup(sender, instance, **kwargs):
+    _remember_rollup(instance, ORDER_ROLLUP_FIELDS, TeacherMonthlyStats.order_contribution)
+
+
+@receiver(post_save, sender=Order)
+def update_order_rollup(sender, instance, **kwargs):
+    _save_rollup(instance, TeacherMonthlyStats.order_contribution)
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_rollup(sender, instance, **kwargs):
+    _delete_rollup(instance)
+
+
+@receiver(post_init, sender=SalaryApplication)
+def remember_application_rollup(sender, instance, **kwargs):
+    _remember_rollup(instance, APPLICATION_ROLLUP_FIELDS, TeacherMonthlyStats.application_contribution)
+
+
+@receiver(post_save, sender=SalaryApplication)
+def update_application_rollup(sender, instance, **kwargs):
+    _save_rollup(instance, TeacherMonthlyStats.application_contribution)
+
+
+@receiver(post_delete, sender=SalaryApplication)
+def remove_application_rollup(sender, instance, **kwargs):
+    _delete_rollup(instance)
+
+
+# 视图缓存失效
+#
+# 模型保存或删除后递增其数据代数，依赖该模型的视图缓存不再命中。操作日志只通过 oplog 批量写入，
+# 在写入处递增（不注册删除信号，以免归档时的批量删除逐条加载记录）。
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=SalaryApplication)
+@receiver(post_delete, sender=SalaryApplication)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=TeacherInfo)
+@receiver(post_delete, sender=TeacherInfo)
+def invalidate_view_cache(sender, **kwargs):
+    view_cache.bump(sender)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_view_cache(sender, update_fields=None, **kwargs):
+    # 登录时只更新 last_login，列表中不显示，不必使缓存失效
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        view_cache.bump(sender)
+
+
+# 证明材料引用计数
+#
+# 工资申请删除（含随订单、教师级联删除）后，在事务提交时减少文件引用，引用归零时删除文件及其缩略图。
+
+@receiver(post_delete, sender=SalaryApplication)
+def release_proof_file(sender, instance, **kwargs):
+    name = instance.proof_file.name
+    if name:
+        transaction.on_commit(lambda: _release_proof_file(name))
+
+
+def _release_proof_file(name):
+    proof_storage.delete(name)
+    if not proof_storage.exists(name):
+        thumbnail = thumbnails.thumbnail_name(name)
+        if proof_storage.exists(thumbnail):
+            proof_storage.delete(thumbnail)
+
+
+# 订单检索索引
+#
+# 订单保存时在 Order.save 中写入检索记录；删除（含查询集删除和随教师级联删除）及教师改名在此同步。
+
+@receiver(post_delete, sender=Order)
+def remove_order_index(sender, instance, **kwargs):
+    search.remove_order(instance.pk)
+
+
+@receiver(post_init, sender=User)
+def remember_username(sender, instance, **kwargs):
+    # 延迟加载用户名时不读取，保存时总是同步
+    instance._indexed_username = None if 'username' in instance.get_deferred_fields() else instance.username
+
+
+@receiver(post_save, sender=User)
+def update_order_index_username(sender, instance, created, **kwargs):
+    if not created and instance.username != instance._indexed_username:
+        search.update_teacher_username(instance.pk, instance.username)
+    instance._indexed_username = instance.username
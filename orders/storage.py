@@ -0,0 +1,100 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    按内容寻址、去重存储的文件存储（用于工资申请证明材料）。
+
+    上传时边写入临时文件边计算SHA-256，最终保存为 <upload_to>/ab/cd/<sha256>.<扩展名>。
+    相同内容只保存一份，StoredFile记录引用次数，delete()在引用归零时才删除物理文件。
+    两级分片目录避免单个目录下文件过多。
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # 最终文件名由内容决定，不需要为重名追加随机后缀
+        return name
+
+    def _save(self, name, content):
+        directory = posixpath.dirname(name)
+        extension = posixpath.splitext(name)[1].lower()
+
+        temp_directory = self.path(posixpath.join(directory, 'tmp'))
+        os.makedirs(temp_directory, exist_ok=True)
+
+        digest = hashlib.sha256()
+        size = 0
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        with tempfile.NamedTemporaryFile(dir=temp_directory, delete=False) as temp_file:
+            for chunk in content.chunks():
+                digest.update(chunk)
+                temp_file.write(chunk)
+                size += len(chunk)
+        temp_path = temp_file.name
+
+        sha256 = digest.hexdigest()
+        final_name = posixpath.join(directory, sha256[:2], sha256[2:4], sha256 + extension)
+        final_path = self.path(final_name)
+
+        try:
+            if os.path.exists(final_path):
+                # 内容已存在，只增加引用
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp_path, self.file_permissions_mode)
+                os.replace(temp_path, final_path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        # 在调用方的事务中增加引用（SalaryApplication.save 与记录的INSERT同一事务），插入失败时一并回滚
+        self._add_reference(final_name, sha256, size)
+        return final_name
+
+    def delete(self, name):
+        """减少引用次数，引用归零时删除物理文件"""
+        from .models import StoredFile
+
+        with transaction.atomic():
+            stored = StoredFile.objects.select_for_update().filter(name=name).first()
+            if stored is not None and stored.ref_count > 1:
+                StoredFile.objects.filter(pk=stored.pk).update(ref_count=F('ref_count') - 1)
+                return
+            if stored is not None:
+                stored.delete()
+        super().delete(name)
+
+    def discard(self, name):
+        """
+        保存记录失败、事务回滚后调用：该文件没有任何引用时删除物理文件。
+
+        引用计数在记录所在的事务中增加，回滚后已自动撤销；这里只清理新写入而无人引用的文件，
+        不能调用 delete()，否则会扣减其他记录对同一内容的引用。
+        """
+        from .models import StoredFile
+
+        if name and not StoredFile.objects.filter(name=name).exists():
+            super().delete(name)
+
+    def _add_reference(self, name, sha256, size):
+        from .models import StoredFile
+
+        with transaction.atomic():
+            updated = StoredFile.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+            if not updated:
+                StoredFile.objects.create(name=name, sha256=sha256, size=size, ref_count=1)
+
+
+proof_storage = ContentAddressedStorage()
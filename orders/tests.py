@@ -1,3 +1,833 @@
-from django.test import TestCase
+import csv
+import datetime
+import json
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from urllib.parse import quote
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from . import importer, log_archive, oplog, search, thumbnails
+from .management.commands.check_query_plans import full_scans
+from .models import DashboardStats, NumberSequence, OperationLog, Order, SalaryApplication, StoredFile, TeacherMonthlyStats
+from .pagination import DEFAULT_PAGE_SIZE, KeysetPage, keyset_paginate
+from .storage import proof_storage
+
+
+class OrdersTestCase(TestCase):
+    """测试基类：使用进程内缓存、同步写入操作日志，文件写入临时目录"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls._settings = override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            OPERATION_LOG_ASYNC=False,
+            OPERATION_LOG_SPOOL_DIR=f'{cls.temp_dir}/oplog',
+            OPERATION_LOG_ARCHIVE_DIR=f'{cls.temp_dir}/archive',
+            MEDIA_ROOT=f'{cls.temp_dir}/media',
+        )
+        cls._settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._settings.disable()
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.admin = User.objects.create_user('boss', 'pw', role='super_admin', is_staff=True)
+        self.teacher = User.objects.create_user('t1', 'pw', role='teacher')
+
+    def create_order(self, teacher=None, **fields):
+        values = {
+            'name': '课程', 'student_count': 1, 'service_type': 'one_to_one', 'unit_price': Decimal('100'),
+            'total_hours': Decimal('2'), 'status': 'completed', 'teacher': teacher or self.teacher,
+            'created_by': self.admin,
+        }
+        values.update(fields)
+        return Order.objects.create(**values)
+
+    def create_application(self, order, content=b'proof', **fields):
+        values = {
+            'order': order, 'teacher': order.teacher, 'apply_amount': Decimal('50'),
+            'proof_file': SimpleUploadedFile('proof.png', content, content_type='image/png'),
+        }
+        values.update(fields)
+        return SalaryApplication.objects.create(**values)
+
+    def create_logs(self, when, count, **fields):
+        """批量创建 count 条日志，时间从 when 起每条早一分钟"""
+        values = {
+            'user': self.teacher, 'action': 'login', 'object_type': 'User', 'object_id': self.teacher.pk,
+            'ip_address': '127.0.0.1',
+        }
+        values.update(fields)
+        return OperationLog.objects.bulk_create([
+            OperationLog(**values, created_at=when - datetime.timedelta(minutes=i)) for i in range(count)
+        ])
+
+
+class TeacherMonthlyStatsTests(OrdersTestCase):
+
+    def test_delete_teacher_with_orders_and_applications(self):
+        order = self.create_order()
+        self.create_application(order, status='approved')
+        self.create_application(self.create_order(), status='pending')
+        self.client.force_login(self.admin)
+
+        response = self.client.post(f'/accounts/admin/teachers/{self.teacher.pk}/delete/')
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(User.objects.filter(pk=self.teacher.pk).exists())
+        self.assertFalse(TeacherMonthlyStats.objects.exists())
+        # 级联删除后不应留下引用已删除教师的统计行
+        connection.check_constraints()
+
+    def test_negative_adjust_does_not_create_row(self):
+        TeacherMonthlyStats.adjust(self.teacher.pk, TeacherMonthlyStats.month_of(self.teacher.created_at), order_count=-1)
+        self.assertFalse(TeacherMonthlyStats.objects.exists())
+
+    def test_rollup_matches_rebuild(self):
+        order = self.create_order()
+        application = self.create_application(order)
+        application.status = 'approved'
+        application.save()
+        order.status = 'pending'
+        order.save()
+        incremental = {
+            (row.teacher_id, row.month): (row.order_count, row.completed_orders, row.approved_amount)
+            for row in TeacherMonthlyStats.objects.all()
+        }
+        TeacherMonthlyStats.rebuild()
+        rebuilt = {
+            (row.teacher_id, row.month): (row.order_count, row.completed_orders, row.approved_amount)
+            for row in TeacherMonthlyStats.objects.all()
+        }
+        self.assertEqual(incremental, rebuilt)
+
+
+class ProtectedMediaTests(OrdersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.content = bytes(range(256)) * 4
+        application = self.create_application(self.create_order(), content=self.content)
+        self.url = settings.MEDIA_URL + application.proof_file.name
+        self.client.force_login(self.teacher)
+
+    def test_not_compressed(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response)
+        self.assertFalse(response['ETag'].startswith('W/'))
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')['ETag']
+        for header in (etag, 'W/' + etag):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=header, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response.status_code, 304)
+
+    def test_range_describes_bytes_sent(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-4', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 0-4/{len(self.content)}')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(b''.join(response.streaming_content), self.content[:5])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_other_teachers_proof_forbidden(self):
+        other = User.objects.create_user('t2', 'pw', role='teacher')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def legacy_proof(self):
+        """升级前上传、文件名含中文的证明材料"""
+        name = 'proofs/发票.png'
+        application = self.create_application(self.create_order(), content=b'legacy')
+        SalaryApplication.objects.filter(pk=application.pk).update(proof_file=name)
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, 'proofs'), exist_ok=True)
+        with open(os.path.join(settings.MEDIA_ROOT, name), 'wb') as file:
+            file.write(b'legacy')
+        return name
+
+    def test_nginx_redirect_header_is_url_encoded(self):
+        name = self.legacy_proof()
+        with self.settings(PROTECTED_MEDIA_SERVER='nginx', PROTECTED_MEDIA_INTERNAL_URL='/protected-media/'):
+            response = self.client.get(settings.MEDIA_URL + name)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/proofs/%E5%8F%91%E7%A5%A8.png')
+        self.assertEqual(response.content, b'')
+
+    def test_sendfile_header_is_url_encoded(self):
+        name = self.legacy_proof()
+        with self.settings(PROTECTED_MEDIA_SERVER='sendfile'):
+            response = self.client.get(settings.MEDIA_URL + name)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Sendfile'], quote(os.path.join(settings.MEDIA_ROOT, name)))
+        self.assertTrue(response['X-Sendfile'].isascii())
+
+
+class ThumbnailTests(OrdersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other_teacher = User.objects.create_user('t2', 'pw', role='teacher')
+        # 内容寻址存储之前上传的文件，同名不同扩展名
+        self.pdf = self.legacy_application(self.teacher, 'proofs/x.pdf')
+        self.png = self.legacy_application(self.other_teacher, 'proofs/x.png')
+
+    def legacy_application(self, teacher, name):
+        application = self.create_application(self.create_order(teacher=teacher), content=name.encode())
+        SalaryApplication.objects.filter(pk=application.pk).update(proof_file=name)
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, 'proofs'), exist_ok=True)
+        for path in (name, thumbnails.thumbnail_name(name)):
+            with open(os.path.join(settings.MEDIA_ROOT, path), 'wb') as file:
+                file.write(path.encode())
+        return name
+
+    def test_name_keeps_original_extension(self):
+        self.assertEqual(thumbnails.thumbnail_name('proofs/x.pdf'), 'proofs/x.pdf.thumb.jpg')
+        self.assertNotEqual(thumbnails.thumbnail_name(self.pdf), thumbnails.thumbnail_name(self.png))
+        with self.settings(THUMBNAIL_FORMAT='WEBP'):
+            self.assertEqual(thumbnails.thumbnail_name('proofs/x.pdf'), 'proofs/x.pdf.thumb.webp')
+        self.assertEqual(thumbnails.source_name('proofs/x.pdf.thumb.jpg'), 'proofs/x.pdf')
+        self.assertIsNone(thumbnails.source_name('proofs/x.pdf.thumb.webp'))
+        self.assertIsNone(thumbnails.source_name('proofs/x.pdf'))
+
+    def test_teacher_only_gets_own_proof_and_thumbnail(self):
+        self.client.force_login(self.teacher)
+        for name in (self.pdf, thumbnails.thumbnail_name(self.pdf)):
+            self.assertEqual(self.client.get(settings.MEDIA_URL + name).status_code, 200)
+        for name in (self.png, thumbnails.thumbnail_name(self.png)):
+            self.assertEqual(self.client.get(settings.MEDIA_URL + name).status_code, 403)
+
+    def test_generate_writes_configured_format(self):
+        from PIL import Image
+
+        application = self.create_application(self.create_order(), content=b'')
+        path = os.path.join(settings.MEDIA_ROOT, application.proof_file.name)
+        Image.new('RGB', (800, 600), 'red').save(path, format='PNG')
+        thumb = thumbnails.generate(application.proof_file.name)
+        self.assertEqual(thumb, application.proof_file.name + '.thumb.jpg')
+        with Image.open(os.path.join(settings.MEDIA_ROOT, thumb)) as image:
+            self.assertEqual((image.format, max(image.size)), ('JPEG', max(thumbnails.THUMBNAIL_SIZE)))
+
+
+class ProofStorageTests(OrdersTestCase):
+
+    def test_same_content_is_stored_once(self):
+        first = self.create_application(self.create_order())
+        second = self.create_application(self.create_order())
+        self.assertEqual(first.proof_file.name, second.proof_file.name)
+        self.assertEqual(StoredFile.objects.get(name=first.proof_file.name).ref_count, 2)
+
+    def test_delete_releases_reference(self):
+        first = self.create_application(self.create_order())
+        second = self.create_application(self.create_order())
+        name = first.proof_file.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(StoredFile.objects.get(name=name).ref_count, 1)
+        self.assertTrue(proof_storage.exists(name))
+
+        # 随订单级联删除同样释放引用，最后一个引用释放后删除文件
+        with self.captureOnCommitCallbacks(execute=True):
+            second.order.delete()
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+        self.assertFalse(proof_storage.exists(name))
+
+    def test_failed_insert_does_not_keep_reference(self):
+        order = self.create_order()
+        self.create_application(order, content=b'first')
+        duplicate = SalaryApplication(
+            order=order, teacher=self.teacher, apply_amount=Decimal('50'),
+            proof_file=SimpleUploadedFile('proof.png', b'second', content_type='image/png'),
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            # 同一订单已有待审核申请，部分唯一约束拒绝插入
+            duplicate.save()
+        self.assertEqual(StoredFile.objects.count(), 1)
+
+        # 回滚后新写入的文件无人引用，discard 将其删除
+        self.assertTrue(proof_storage.exists(duplicate.proof_file.name))
+        proof_storage.discard(duplicate.proof_file.name)
+        self.assertFalse(proof_storage.exists(duplicate.proof_file.name))
+
+
+class LogListArchiveTests(OrdersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # 归档目录在同一测试类中共用，每个测试从空归档开始
+        shutil.rmtree(settings.OPERATION_LOG_ARCHIVE_DIR, ignore_errors=True)
+        now = timezone.now()
+        self.old_day = (now - datetime.timedelta(days=200)).date()
+        self.create_logs(now, 5)
+        self.create_logs(now - datetime.timedelta(days=200), 3)
+        log_archive.archive_month(self.old_day.replace(day=1))
+        self.client.force_login(self.admin)
+
+    def listed(self, query=''):
+        return list(self.client.get('/orders/log/?' + query).context['page'])
+
+    def test_archive_included_without_dates(self):
+        self.assertEqual(OperationLog.objects.count(), 5)
+        self.assertEqual(len(self.listed()), 8)
+
+    def test_archive_included_with_end_date_only(self):
+        self.assertEqual(len(self.listed(f'end_date={timezone.localdate().isoformat()}')), 8)
+        self.assertEqual(len(self.listed(f'end_date={self.old_day.isoformat()}')), 3)
+
+    def test_end_date_before_archive_skips_it(self):
+        end = self.old_day.replace(day=1) - datetime.timedelta(days=1)
+        with mock.patch.object(log_archive, 'search_archive') as search_archive:
+            self.assertEqual(self.listed(f'end_date={end.isoformat()}'), [])
+        search_archive.assert_not_called()
+
+    def test_archive_read_only_after_hot_rows(self):
+        self.create_logs(timezone.now() - datetime.timedelta(hours=1), 30)
+        with mock.patch.object(log_archive, 'search_archive', return_value=([], False)) as search_archive:
+            self.assertEqual(len(self.listed()), 20)
+        search_archive.assert_not_called()
+
+
+class OrderSearchIndexTests(OrdersTestCase):
+
+    def found(self, keyword):
+        return list(search.search_orders(Order.objects.all(), keyword).values_list('pk', flat=True))
+
+    def test_rename_teacher_updates_index(self):
+        order = self.create_order()
+        self.teacher.username = 'renamed'
+        self.teacher.save()
+        self.assertEqual(self.found('renamed'), [order.pk])
+        self.assertEqual(self.found('t1'), [])
+
+    def test_queryset_and_cascade_delete_remove_index(self):
+        first, second = self.create_order(name='数学课'), self.create_order(name='数学课')
+        Order.objects.filter(pk=first.pk).delete()
+        self.assertEqual(self.found('数学课'), [second.pk])
+
+        self.teacher.delete()
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {search.FTS_TABLE}')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+
+class DashboardStatsTests(OrdersTestCase):
+
+    def assert_matches_compute(self):
+        stats = DashboardStats.load()
+        self.assertEqual(
+            {field: getattr(stats, field) for field in DashboardStats.compute()}, DashboardStats.compute()
+        )
+
+    def test_counters_follow_changes(self):
+        DashboardStats.reconcile()
+        first = self.create_application(self.create_order(), apply_amount=Decimal('30'))
+        second = self.create_application(self.create_order(), content=b'other')
+        self.assert_matches_compute()
+
+        first.status = 'approved'
+        first.save()
+        second.status = 'rejected'
+        second.save()
+        self.assert_matches_compute()
+        self.assertEqual(DashboardStats.load().approved_amount, Decimal('30'))
+
+        # 延迟加载状态字段的记录保存时全量校正
+        deferred = SalaryApplication.objects.defer('status').get(pk=first.pk)
+        deferred.status = 'pending'
+        deferred.save()
+        self.assert_matches_compute()
+
+        first.order.delete()
+        User.objects.create_user('t2', 'pw', role='teacher')
+        self.assert_matches_compute()
+        self.assertEqual(DashboardStats.load().total_teachers, 2)
+
+    def test_adjust_without_row_reconciles(self):
+        self.create_order()
+        DashboardStats.objects.all().delete()
+        DashboardStats.adjust(total_orders=1)
+        self.assertEqual(DashboardStats.load().total_orders, 1)
+
+
+class OperationLogSpoolTests(OrdersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.spool_dir = settings.OPERATION_LOG_SPOOL_DIR
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+    def segments(self):
+        return sorted(os.listdir(self.spool_dir))
+
+    def test_writer_spools_then_writes_batch(self):
+        writer = oplog.LogWriter(self.spool_dir, batch_size=100, interval=60)
+        self.addCleanup(writer.close)
+        for _ in range(3):
+            writer.submit(oplog._serialize({
+                'user': self.teacher, 'action': 'login', 'object_type': 'User', 'object_id': self.teacher.pk,
+            }))
+        # 写入数据库之前日志已在预写文件中
+        self.assertEqual(len(self.segments()), 1)
+        self.assertFalse(OperationLog.objects.exists())
+
+        writer.flush()
+        self.assertEqual(OperationLog.objects.filter(user=self.teacher, action='login').count(), 3)
+        self.assertEqual(self.segments(), [])
+
+    def test_replay_orphaned_segments(self):
+        os.makedirs(self.spool_dir)
+        # 超过Linux最大进程ID，视为已退出的进程
+        path = os.path.join(self.spool_dir, 'oplog-4194305-1.jsonl')
+        created_at = timezone.now().isoformat()
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps({
+                'user_id': self.teacher.pk, 'action': 'login', 'object_type': 'User',
+                'object_id': self.teacher.pk, 'params': {}, 'ip_address': '', 'created_at': created_at,
+            }) + '\n')
+            # 升级前的旧格式
+            file.write(json.dumps({
+                'user_id': self.admin.pk, 'action': 'delete', 'object_type': 'Teacher', 'object_id': '7',
+                'object_name': 'gone', 'description': '删除了教师gone', 'ip_address': '', 'created_at': created_at,
+            }, ensure_ascii=False) + '\n')
+            # 进程崩溃时写了一半的行
+            file.write('{"user_id": ')
+        # 本进程的预写文件不补写
+        own = os.path.join(self.spool_dir, f'oplog-{os.getpid()}-1.jsonl')
+        open(own, 'w').close()
+
+        with self.assertLogs('orders.oplog', 'WARNING'):
+            self.assertEqual(oplog.replay_orphaned(self.spool_dir), 2)
+        self.assertEqual(self.segments(), [os.path.basename(own)])
+        deleted = OperationLog.objects.get(action='delete')
+        self.assertEqual((deleted.object_id, deleted.params['name']), (7, 'gone'))
+
+
+class LogArchiveTests(OrdersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        shutil.rmtree(settings.OPERATION_LOG_ARCHIVE_DIR, ignore_errors=True)
+        self.month = log_archive.add_months(timezone.localdate().replace(day=1), -3)
+        self.when = log_archive._month_start(self.month) + datetime.timedelta(days=10)
+
+    def test_archive_old_logs(self):
+        self.create_logs(self.when, 3)
+        self.create_logs(self.when, 2, user=self.admin, action='logout')
+        self.create_logs(timezone.now(), 1)
+
+        self.assertEqual(log_archive.archive_old_logs(keep_months=2), [(self.month, 5)])
+        self.assertEqual(log_archive.archived_months(), [self.month])
+        self.assertEqual(OperationLog.objects.count(), 1)
+        self.assertEqual(len(list(log_archive.iter_archived(self.month))), 5)
+
+        logs, truncated = log_archive.search_archive(action='logout')
+        self.assertEqual([log.user for log in logs], [self.admin, self.admin])
+        self.assertFalse(truncated)
+        logs, truncated = log_archive.search_archive(user_id=self.teacher.pk, limit=2)
+        self.assertEqual(len(logs), 2)
+        self.assertTrue(truncated)
+        self.assertEqual(len(log_archive.search_archive(search='boss')[0]), 2)
+        self.assertEqual(log_archive.search_archive(end=log_archive._month_start(self.month)), ([], False))
+
+    def test_archive_month_appends(self):
+        self.create_logs(self.when, 2)
+        log_archive.archive_month(self.month)
+        self.create_logs(self.when + datetime.timedelta(days=1), 1)
+        self.assertEqual(log_archive.archive_month(self.month), 1)
+        logs = log_archive.search_archive()[0]
+        self.assertEqual(len(logs), 3)
+        # 倒序排列
+        self.assertEqual(logs, sorted(logs, key=lambda log: (log.created_at, log.pk), reverse=True))
+
+
+class KeysetPaginationTests(OrdersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        self.create_logs(now, 3)
+        # 时间相同的记录按ID区分先后
+        self.create_logs(now - datetime.timedelta(hours=1), 1)
+        self.create_logs(now - datetime.timedelta(hours=1), 1)
+        self.expected = list(OperationLog.objects.order_by('-created_at', '-id'))
+
+    def paginate(self, query='', older=()):
+        return keyset_paginate(RequestFactory().get('/orders/log/?' + query), OperationLog.objects.all(),
+                               per_page=2, older=older)
+
+    def test_forward_and_backward(self):
+        pages, query = [], 'action=login'
+        while True:
+            page = self.paginate(query)
+            pages.append(page)
+            if not page.has_next():
+                break
+            query = page.next_query
+            # 翻页时保留其余查询参数
+            self.assertIn('action=login', query)
+        self.assertEqual([log for page in pages for log in page], self.expected)
+        self.assertFalse(pages[0].has_previous())
+
+        back = self.paginate(pages[-1].previous_query)
+        self.assertEqual(list(back), list(pages[-2]))
+        self.assertTrue(back.has_next())
+
+    def test_older_rows_follow_queryset(self):
+        archived = [OperationLog(pk=0, created_at=self.expected[-1].created_at - datetime.timedelta(days=1))]
+        load = mock.Mock(return_value=archived)
+        first = self.paginate(older=load)
+        load.assert_not_called()
+
+        rows = list(first)
+        page = first
+        while page.has_next():
+            page = self.paginate(page.next_query, older=load)
+            rows += list(page)
+        self.assertEqual(rows, self.expected + archived)
+
+    def test_previous_page_reads_older_rows_only_past_queryset(self):
+        archived = [
+            OperationLog(pk=-i, created_at=self.expected[-1].created_at - datetime.timedelta(days=i))
+            for i in range(1, 4)
+        ]
+        load = mock.Mock(return_value=archived)
+        pages = [self.paginate(older=load)]
+        while pages[-1].has_next():
+            pages.append(self.paginate(pages[-1].next_query, older=load))
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 2])
+
+        # 游标仍在 queryset 范围内时向前翻页不读取 older
+        load.reset_mock()
+        self.assertEqual(list(self.paginate(pages[2].previous_query, older=load)), list(pages[1]))
+        load.assert_not_called()
+
+        # 游标已在 older 中时，向前翻页依次取 older 中较新的记录和 queryset 中最早的记录
+        self.assertEqual(list(self.paginate(pages[3].previous_query, older=load)), list(pages[2]))
+        load.assert_called_once()
+
+    def test_invalid_cursor_starts_from_first_page(self):
+        self.assertEqual(list(self.paginate('after=not-a-cursor')), self.expected[:2])
+
+
+class SalaryApplicationListTests(OrdersTestCase):
+
+    def test_empty_row_spans_all_columns(self):
+        for user, columns in ((self.admin, 10), (self.teacher, 8)):
+            self.client.force_login(user)
+            response = self.client.get('/orders/applications/')
+            self.assertContains(response, f'<td colspan="{columns}" class="text-center">暂无申请记录</td>', html=True)
+            # 旧的页码分页链接已移除
+            self.assertNotContains(response, '?page=')
+
+
+class QueryPlanTests(OrdersTestCase):
+
+    def test_list_queries_use_indexes(self):
+        output = StringIO()
+        call_command('check_query_plans', stdout=output)
+        self.assertNotIn('[全表扫描]', output.getvalue())
+
+    def test_filtered_index_walk_is_full_scan(self):
+        # name 上没有索引，只能按 created_at 索引遍历整张表
+        queryset = Order.objects.filter(name='x').order_by('-created_at')
+        self.assertEqual(full_scans(queryset, queryset.explain()), ['orders_order'])
+        # 不带筛选条件、或有LIMIT时按索引顺序读取即可
+        for queryset in (Order.objects.order_by('-created_at'),
+                         Order.objects.filter(name='x').order_by('-created_at')[:5]):
+            self.assertEqual(full_scans(queryset, queryset.explain()), [])
+
+
+class BulkReviewTests(OrdersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.first = self.create_application(self.create_order(), apply_amount=Decimal('30'))
+        self.second = self.create_application(self.create_order(), content=b'second', apply_amount=Decimal('20'))
+        self.done = self.create_application(self.create_order(), content=b'done', status='approved')
+        DashboardStats.reconcile()
+        self.client.force_login(self.admin)
+
+    def review(self, action, *applications):
+        response = self.client.post('/orders/applications/bulk-review/', {
+            'action': action, 'remarks': '批量', 'application_ids': [application.pk for application in applications],
+        }, follow=True)
+        return [str(message) for message in response.context['messages']]
+
+    def test_approve_counts_duplicates_once(self):
+        before = DashboardStats.load()
+        messages = self.review('approve', self.first, self.first, self.done)
+        self.assertEqual(messages, ['已批量通过1条申请，1条不是待审核状态，已跳过'])
+
+        self.first.refresh_from_db()
+        self.assertEqual((self.first.status, self.first.approved_by), ('approved', self.admin))
+        stats = DashboardStats.load()
+        self.assertEqual(stats.pending_applications, before.pending_applications - 1)
+        self.assertEqual(stats.approved_amount, before.approved_amount + Decimal('30'))
+        self.assert_rollup_matches_rebuild()
+        self.assertEqual(
+            list(OperationLog.objects.filter(action='approve').values_list('object_id', 'params', 'user')),
+            [(self.first.pk, {'via': 'bulk'}, self.admin.pk)]
+        )
+
+    def test_reject_releases_orders(self):
+        messages = self.review('reject', self.first, self.second)
+        self.assertEqual(messages, ['已批量拒绝2条申请'])
+        self.assertEqual(DashboardStats.load().pending_applications, 0)
+        self.assertEqual(SalaryApplication.objects.filter(status='rejected').count(), 2)
+        self.assertFalse(Order.objects.filter(pk__in=[self.first.order_id, self.second.order_id],
+                                              has_active_application=True).exists())
+        self.assert_rollup_matches_rebuild()
+        self.assertEqual(OperationLog.objects.filter(action='reject', params__via='bulk').count(), 2)
+
+    def assert_rollup_matches_rebuild(self):
+        def rows():
+            return {
+                (row.teacher_id, row.month): (row.approved_applications, row.approved_amount)
+                for row in TeacherMonthlyStats.objects.all()
+            }
+        incremental = rows()
+        TeacherMonthlyStats.rebuild()
+        self.assertEqual(incremental, rows())
+
+
+class ExportTests(OrdersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def export(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(content.startswith('\ufeff'))
+        return list(csv.reader(content[1:].splitlines()))
+
+    def test_order_export(self):
+        completed = self.create_order(name='数学课', unit_price=Decimal('150'), total_hours=Decimal('2'))
+        self.create_order(name='英语课', status='pending')
+
+        rows = self.export('/orders/admin/orders/export/?status=completed')
+        self.assertEqual(rows[0], ['订单编号', '订单名称', '分配教师', '服务学生数', '服务类型', '单价', '总时长', '总金额',
+                                   '订单状态', '创建时间'])
+        created_at = timezone.localtime(completed.created_at).strftime('%Y-%m-%d %H:%M')
+        self.assertEqual(rows[1:], [[
+            completed.order_number, '数学课', 't1', '1', completed.get_service_type_display(), '150.00', '2.00',
+            '300.00', '已完成', created_at,
+        ]])
+        self.assertEqual(len(self.export('/orders/admin/orders/export/')), 3)
+        self.assertEqual([row[1] for row in self.export('/orders/admin/orders/export/?search=英语课')[1:]], ['英语课'])
+
+    def test_application_export(self):
+        approved_at = timezone.now()
+        approved = self.create_application(self.create_order(), status='approved', approved_at=approved_at)
+        self.create_application(self.create_order(), content=b'other')
+
+        rows = self.export('/orders/applications/export/?status=approved')
+        self.assertEqual(rows[0], ['申请编号', '教师', '订单编号', '订单名称', '申请金额', '审核状态', '申请时间', '审批时间'])
+        self.assertEqual(rows[1:], [[
+            approved.application_number, 't1', approved.order.order_number, '课程', '50.00', '通过',
+            timezone.localtime(approved.created_at).strftime('%Y-%m-%d %H:%M'),
+            timezone.localtime(approved_at).strftime('%Y-%m-%d %H:%M'),
+        ]])
+        pending = self.export('/orders/applications/export/?status=pending')
+        self.assertEqual([row[5] for row in pending[1:]], ['待审核'])
+        self.assertEqual(pending[1][7], '')
+
+    def test_teacher_cannot_export(self):
+        self.client.force_login(self.teacher)
+        for url in ('/orders/admin/orders/export/', '/orders/applications/export/'):
+            self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class OrderImportTests(OrdersTestCase):
+
+    HEADER = '订单名称,分配教师,服务学生数,服务类型,单价,总时长,订单状态\n'
+
+    def upload(self, content):
+        self.client.force_login(self.admin)
+        csv_file = SimpleUploadedFile('orders.csv', ('\ufeff' + content).encode('utf-8'), content_type='text/csv')
+        return self.client.post('/orders/admin/orders/import/', {'csv_file': csv_file})
+
+    def test_valid_import(self):
+        DashboardStats.reconcile()
+        response = self.upload(self.HEADER + '数学课,t1,2,一对二,100,3,已完成\n英语课,t1,1,一对一,80.5,2,\n')
+        self.assertRedirects(response, '/orders/admin/orders/', fetch_redirect_response=False)
+
+        orders = list(Order.objects.order_by('order_number'))
+        self.assertEqual([(order.name, order.status, order.total_amount) for order in orders],
+                         [('数学课', 'completed', Decimal('300')), ('英语课', 'pending', Decimal('161'))])
+        self.assertEqual(DashboardStats.load().total_orders, 2)
+        self.assertEqual(OperationLog.objects.filter(action='create', params__via='import').count(), 2)
+        self.assertEqual(list(search.search_orders(Order.objects.all(), '英语课')), [orders[1]])
+        self.assertEqual(TeacherMonthlyStats.objects.get(teacher=self.teacher).order_count, 2)
+
+    def test_row_errors_import_nothing(self):
+        response = self.upload(
+            self.HEADER + '数学课,t1,2,一对二,100,3,\n英语课,nobody,1,一对一,80,2,\n物理课,t1,x,一对一,80,2,\n'
+        )
+        self.assertEqual(response.status_code, 200)
+        errors = response.context['errors']
+        self.assertEqual([line for line, _ in errors], [3, 4])
+        self.assertIn('教师“nobody”不存在', errors[0][1])
+        self.assertIn('服务学生数', errors[1][1])
+        self.assertFalse(Order.objects.exists())
+
+    def test_missing_columns(self):
+        result = importer.import_orders(StringIO('订单名称,分配教师\n数学课,t1\n'), self.admin)
+        self.assertEqual(result.errors, [(1, '缺少列：student_count, service_type, unit_price, total_hours')])
+
+    def test_failed_insert_rolls_back_batch(self):
+        content = self.HEADER + '数学课,t1,2,一对二,100,3,\n英语课,t1,1,一对一,80,2,\n'
+        with mock.patch.object(OperationLog.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                importer.import_orders(StringIO(content), self.admin)
+        self.assertFalse(Order.objects.exists())
+        # 编号预留随事务回滚，下次导入仍从1开始
+        result = importer.import_orders(StringIO(content), self.admin)
+        self.assertEqual([order.order_number[-6:] for order in result.orders], ['000001', '000002'])
+
+
+class NumberSequenceTests(OrdersTestCase):
+
+    def test_reservations_are_consecutive(self):
+        self.assertEqual(NumberSequence.next_numbers('T', 3), ['T000001', 'T000002', 'T000003'])
+        self.assertEqual(NumberSequence.next_numbers('T', 2), ['T000004', 'T000005'])
+        # 不同前缀各自计数
+        self.assertEqual(NumberSequence.next_numbers('U'), ['U000001'])
+
+    def test_import_and_single_saves_share_sequence(self):
+        first = self.create_order()
+        result = importer.import_orders(StringIO(
+            OrderImportTests.HEADER + '数学课,t1,2,一对二,100,3,\n英语课,t1,1,一对一,80,2,\n'
+        ), self.admin)
+        last = self.create_order()
+
+        numbers = [first.order_number] + [order.order_number for order in result.orders] + [last.order_number]
+        prefix = timezone.now().strftime('ORD%Y%m%d')
+        self.assertEqual(numbers, [f'{prefix}{sequence:06d}' for sequence in range(1, 5)])
+        self.assertEqual(Order.objects.filter(order_number__in=numbers).count(), 4)
+
+    def test_application_numbers(self):
+        first = self.create_application(self.create_order())
+        second = self.create_application(self.create_order(), content=b'second')
+        self.assertEqual(int(second.application_number[-6:]), int(first.application_number[-6:]) + 1)
+
+
+class ActiveApplicationFlagTests(OrdersTestCase):
+
+    def flag(self, order):
+        order.refresh_from_db(fields=['has_active_application'])
+        return order.has_active_application
+
+    def test_flag_follows_application_status(self):
+        order = self.create_order()
+        self.assertFalse(self.flag(order))
+        application = self.create_application(order)
+        self.assertTrue(self.flag(order))
+
+        self.client.force_login(self.teacher)
+        self.client.post(f'/orders/applications/{application.pk}/withdraw/')
+        application.refresh_from_db()
+        self.assertEqual(application.status, 'withdrawn')
+        self.assertFalse(self.flag(order))
+
+        application = self.create_application(order, content=b'again')
+        self.assertTrue(self.flag(order))
+        self.client.force_login(self.admin)
+        self.client.post(f'/orders/applications/{application.pk}/reject/', {'remarks': '材料不全'})
+        self.assertFalse(self.flag(order))
+
+    def test_second_active_application_rejected(self):
+        order = self.create_order()
+        self.create_application(order)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            SalaryApplication.objects.create(
+                order=order, teacher=self.teacher, apply_amount=Decimal('10'), status='approved',
+                proof_file=SimpleUploadedFile('proof.png', b'again', content_type='image/png'),
+            )
+
+    def test_create_view_discards_file_when_constraint_fails(self):
+        order = self.create_order()
+        # 绕过 save() 写入的待审核申请不会更新订单标记，表单仍允许选择该订单（模拟并发提交）
+        SalaryApplication.objects.bulk_create([SalaryApplication(
+            order=order, teacher=self.teacher, apply_amount=Decimal('10'), proof_file='proofs/legacy.png',
+        )])
+        self.client.force_login(self.teacher)
+        with mock.patch.object(proof_storage, 'discard', wraps=proof_storage.discard) as discard:
+            response = self.client.post('/orders/teacher/applications/create/', {
+                'order': order.pk, 'apply_amount': '50',
+                'proof_file': SimpleUploadedFile('proof.png', b'duplicate', content_type='image/png'),
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response.context['form'], 'order', '该订单已有待审核或已通过的工资申请')
+        discard.assert_called_once()
+        self.assertFalse(proof_storage.exists(discard.call_args.args[0]))
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertEqual(SalaryApplication.objects.count(), 1)
+
+
+class SalaryApplicationPaginationTests(OrdersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        other = User.objects.create_user('t2', 'pw', role='teacher')
+        self.create_application(self.create_order(teacher=other))
+        self.expected = [
+            self.create_application(self.create_order()) for _ in range(DEFAULT_PAGE_SIZE + 1)
+        ][::-1]
+
+    def test_pages_and_caches_only_current_page(self):
+        from . import views
+
+        self.client.force_login(self.teacher)
+        cached = []
+        cached_view_data = views.cached_view_data
+
+        def spy(*args):
+            cached.append(cached_view_data(*args))
+            return cached[-1]
+
+        with mock.patch.object(views, 'cached_view_data', spy):
+            first = self.client.get('/orders/teacher/applications/').context['page']
+        # 缓存的是当前页而不是全部申请
+        self.assertIsInstance(cached[0], KeysetPage)
+        self.assertEqual(list(first), self.expected[:DEFAULT_PAGE_SIZE])
+        self.assertTrue(first.has_next())
+
+        second = self.client.get('/orders/teacher/applications/?' + first.next_query).context['page']
+        # 只显示本人的申请
+        self.assertEqual(list(second), self.expected[DEFAULT_PAGE_SIZE:])
+        self.assertFalse(second.has_next())
+
+        self.client.force_login(self.admin)
+        first = self.client.get('/orders/applications/').context['page']
+        second = self.client.get('/orders/applications/?' + first.next_query).context['page']
+        self.assertEqual(len(first) + len(second), DEFAULT_PAGE_SIZE + 2)
@@ -0,0 +1,134 @@
+import io
+import logging
+import os
+import posixpath
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+
+from .storage import proof_storage
+
+logger = logging.getLogger(__name__)
+
+# 缩略图最大边长（像素）
+THUMBNAIL_SIZE = (320, 320)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+# 缩略图格式 -> 扩展名
+FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+
+def thumbnail_name(name):
+    """缩略图与原文件放在同一目录：<原文件名（含扩展名）>.thumb.jpg / .thumb.webp"""
+    return f'{name}.thumb.{FORMAT_EXTENSIONS[_thumbnail_format()]}'
+
+
+def source_name(thumb):
+    """缩略图对应的原文件名，不是缩略图名称时返回None"""
+    if '.thumb.' not in posixpath.basename(thumb):
+        return None
+    name = thumb.rsplit('.thumb.', 1)[0]
+    return name if thumbnail_name(name) == thumb else None
+
+
+def thumbnail_url(name, storage=proof_storage):
+    """缩略图已生成时返回其URL，否则返回None"""
+    if not name:
+        return None
+    thumb = thumbnail_name(name)
+    return storage.url(thumb) if storage.exists(thumb) else None
+
+
+def schedule(name, storage=proof_storage):
+    """在事务提交后将缩略图生成任务交给后台线程池，不阻塞上传请求"""
+    if not name:
+        return
+    if not getattr(settings, 'THUMBNAIL_ASYNC', True):
+        transaction.on_commit(lambda: _generate_safely(name, storage))
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_generate_safely, name, storage))
+
+
+def generate(name, storage=proof_storage):
+    """生成缩略图，已存在时直接返回。返回缩略图名称，无法生成时返回None"""
+    thumb = thumbnail_name(name)
+    if storage.exists(thumb):
+        return thumb
+
+    source_path = storage.path(name)
+    if name.lower().endswith('.pdf'):
+        image = _render_pdf_first_page(source_path)
+    else:
+        image = _open_image(source_path)
+    if image is None:
+        return None
+
+    image.thumbnail(THUMBNAIL_SIZE)
+    buffer = io.BytesIO()
+    image.save(buffer, format=_thumbnail_format(), quality=75)
+
+    # 先写临时文件再原子替换，避免请求读到写了一半的缩略图
+    thumb_path = storage.path(thumb)
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(thumb_path), delete=False) as temp_file:
+        temp_file.write(buffer.getvalue())
+    os.replace(temp_file.name, thumb_path)
+    return thumb
+
+
+def _generate_safely(name, storage):
+    try:
+        generate(name, storage)
+    except Exception:
+        logger.exception('生成缩略图失败：%s', name)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2),
+                thread_name_prefix='thumbnail'
+            )
+    return _executor
+
+
+def _thumbnail_format():
+    # 由配置决定而不是运行时检测Pillow是否支持WEBP，否则不同部署环境下缩略图名称不一致
+    return getattr(settings, 'THUMBNAIL_FORMAT', 'JPEG')
+
+
+def _open_image(path):
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(path) as image:
+            image = ImageOps.exif_transpose(image)
+            return image.convert('RGB')
+    except (UnidentifiedImageError, OSError):
+        return None
+
+
+def _render_pdf_first_page(path):
+    """使用poppler的pdftoppm渲染PDF第一页，未安装时不生成缩略图"""
+    if shutil.which('pdftoppm') is None:
+        return None
+
+    with tempfile.TemporaryDirectory() as temp_directory:
+        output = os.path.join(temp_directory, 'page')
+        result = subprocess.run(
+            ['pdftoppm', '-f', '1', '-l', '1', '-singlefile', '-scale-to', str(max(THUMBNAIL_SIZE)),
+             '-jpeg', path, output],
+            capture_output=True, timeout=30
+        )
+        if result.returncode != 0:
+            return None
+        return _open_image(output + '.jpg')
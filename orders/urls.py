@@ -1,9 +1,10 @@
 from django.urls import path
 from .views import (
-    admin_order_list, admin_order_create, admin_order_edit, admin_order_detail,
+    admin_order_list, admin_order_export, admin_order_import, admin_order_create, admin_order_edit, admin_order_detail,
     teacher_order_list, teacher_order_detail,
-    salary_application_list, salary_application_create, salary_application_detail,
-    salary_application_approve, salary_application_reject, salary_application_withdraw,
+    salary_application_list, salary_application_export, salary_application_create, salary_application_detail,
+    salary_application_approve, salary_application_reject, salary_application_bulk_review,
+    salary_application_withdraw,
     log_list, data_backup
 )
 
@@ -12,6 +13,8 @@ app_name = 'orders'
 urlpatterns = [
     # 管理员订单管理
     path('admin/orders/', admin_order_list, name='admin_order_list'),
+    path('admin/orders/export/', admin_order_export, name='admin_order_export'),
+    path('admin/orders/import/', admin_order_import, name='admin_order_import'),
     path('admin/orders/create/', admin_order_create, name='admin_order_create'),
     path('admin/orders/<int:order_id>/edit/', admin_order_edit, name='admin_order_edit'),
     path('admin/orders/<int:order_id>/', admin_order_detail, name='admin_order_detail'),
@@ -23,7 +26,9 @@ urlpatterns = [
     # 工资申请管理
     path('applications/', salary_application_list, name='salary_application_list'),
     path('teacher/applications/', salary_application_list, name='teacher_salary_application_list'),
+    path('applications/export/', salary_application_export, name='salary_application_export'),
     path('teacher/applications/create/', salary_application_create, name='salary_application_create'),
+    path('applications/bulk-review/', salary_application_bulk_review, name='salary_application_bulk_review'),
     path('applications/<int:application_id>/', salary_application_detail, name='salary_application_detail'),
     path('applications/<int:application_id>/approve/', salary_application_approve, name='salary_application_approve'),
     path('applications/<int:application_id>/reject/', salary_application_reject, name='salary_application_reject'),
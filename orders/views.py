@@ -1,45 +1,73 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponseForbidden
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import HttpResponseForbidden, Http404
+from django.utils._os import safe_join
+from django.db import transaction, IntegrityError
 from django.db.models import Q, Count
+from django.utils import timezone
+import csv
 import datetime
-from .models import Order, SalaryApplication, OperationLog
-from .forms import OrderForm, SalaryApplicationForm
+import os
+from .models import Order, SalaryApplication, OperationLog, DashboardStats, TeacherMonthlyStats
+from .forms import OrderForm, SalaryApplicationForm, OrderImportUploadForm
+from .importer import import_orders
+from .export import stream_csv, EXPORT_CHUNK_SIZE
+from .media import send_file
+from .pagination import keyset_paginate
+from .search import search_orders
+from .storage import proof_storage
+from . import log_archive, log_messages, thumbnails
 from accounts.models import User, TeacherInfo
 from accounts.views import role_required
-from django.views.decorators.cache import cache_page
-from django.views.decorators.vary import vary_on_cookie, vary_on_headers
+from class_os.view_cache import bump, cached_fragments, cached_view_data
+from django.views.decorators.http import require_POST
 
-# 管理员订单列表视图
-@login_required
-@role_required(['super_admin', 'admin'])
-@cache_page(60 * 5)  # 缓存5分钟
-@vary_on_cookie
-@vary_on_headers('User-Agent')
-def admin_order_list(request):
+# 管理员订单筛选（列表与导出共用）
+def _filter_admin_orders(request):
     # 获取筛选参数
     search = request.GET.get('search', '')
     status = request.GET.get('status', '')
     
     # 构建查询
-    orders = Order.objects.all()
+    orders = Order.objects.select_related('teacher')
     
     if search:
-        orders = orders.filter(
-            Q(order_number__icontains=search) |
-            Q(name__icontains=search) |
-            Q(teacher__username__icontains=search)
-        )
+        # 通过检索索引匹配订单编号、名称和教师用户名
+        orders = search_orders(orders, search)
     
     if status:
         orders = orders.filter(status=status)
     
-    # 分页（暂时不实现）
-    orders = orders.order_by('-created_at')
+    return orders, search, status
+
+# 管理员订单列表视图
+@login_required
+@role_required(['super_admin', 'admin'])
+def admin_order_list(request):
+    orders, search, status = _filter_admin_orders(request)
+    
+    # 游标分页：按 (created_at, id) 倒序，不统计总数；所有管理员共享缓存
+    page = cached_view_data(
+        request, 'admin_order_list', 'admin', (Order, User), lambda: keyset_paginate(request, orders)
+    )
+    
+    # 每行单独缓存，订单或分配教师的用户名变更后只重新渲染该行
+    order_rows = cached_fragments(
+        'admin_order_row', page.object_list,
+        lambda order: (order.updated_at, order.teacher.username),
+        lambda order: render_to_string('orders/admin_order_row.html', {
+            'order': order, 'status_choices': Order.STATUS_CHOICES
+        })
+    )
     
     context = {
-        'orders': orders,
+        'orders': page,
+        'order_rows': order_rows,
+        'page': page,
         'search': search,
         'status': status,
         'status_choices': Order.STATUS_CHOICES
@@ -47,6 +75,34 @@ def admin_order_list(request):
     
     return render(request, 'orders/admin_order_list.html', context)
 
+# 管理员导出订单视图
+@login_required
+@role_required(['super_admin', 'admin'])
+def admin_order_export(request):
+    """按列表页的筛选条件流式导出订单CSV"""
+    orders, search, status = _filter_admin_orders(request)
+    
+    status_display = dict(Order.STATUS_CHOICES)
+    service_display = dict(Order.SERVICE_TYPE_CHOICES)
+    
+    # values_list + iterator：逐批读取元组，不构建模型实例
+    values = orders.order_by('-created_at', '-id').values_list(
+        'order_number', 'name', 'teacher__username', 'student_count', 'service_type',
+        'unit_price', 'total_hours', 'total_amount', 'status', 'created_at'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    
+    rows = (
+        (order_number, name, teacher, student_count, service_display.get(service_type, service_type),
+         unit_price, total_hours, total_amount, status_display.get(order_status, order_status),
+         timezone.localtime(created_at).strftime('%Y-%m-%d %H:%M'))
+        for (order_number, name, teacher, student_count, service_type,
+             unit_price, total_hours, total_amount, order_status, created_at) in values
+    )
+    
+    header = ['订单编号', '订单名称', '分配教师', '服务学生数', '服务类型', '单价', '总时长', '总金额', '订单状态', '创建时间']
+    filename = f'orders_{timezone.localtime().strftime("%Y%m%d_%H%M%S")}.csv'
+    return stream_csv(filename, header, rows)
+
 # 管理员创建订单视图
 @login_required
 @role_required(['super_admin', 'admin'])
@@ -59,14 +115,12 @@ def admin_order_create(request):
             order.save()
             
             # 记录操作日志
-            OperationLog.objects.create(
+            OperationLog.record(
                 user=request.user,
                 action='create',
                 object_type='Order',
                 object_id=order.id,
-                object_name=order.order_number,
-                ip_address=request.META.get('REMOTE_ADDR'),
-                description=f'管理员{request.user.username}创建了订单{order.order_number}'
+                ip_address=request.META.get('REMOTE_ADDR')
             )
             
             messages.success(request, '订单创建成功')
@@ -76,6 +130,34 @@ def admin_order_create(request):
     
     return render(request, 'orders/admin_order_create.html', {'form': form})
 
+# 管理员批量导入订单视图
+@login_required
+@role_required(['super_admin', 'admin'])
+def admin_order_import(request):
+    errors = []
+    
+    if request.method == 'POST':
+        form = OrderImportUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                result = import_orders(form.cleaned_data['csv_file'], request.user, request.META.get('REMOTE_ADDR'))
+            except (UnicodeDecodeError, csv.Error) as e:
+                messages.error(request, f'文件解析失败：{str(e)}')
+                return redirect('orders:admin_order_import')
+            
+            if result.ok and result.orders:
+                messages.success(request, f'成功导入{len(result.orders)}个订单')
+                return redirect('orders:admin_order_list')
+            elif result.ok:
+                messages.error(request, '文件中没有订单数据')
+            else:
+                errors = result.errors
+                messages.error(request, f'共{len(errors)}行数据有误，未导入任何订单')
+    else:
+        form = OrderImportUploadForm()
+    
+    return render(request, 'orders/admin_order_import.html', {'form': form, 'errors': errors})
+
 # 管理员编辑订单视图
 @login_required
 @role_required(['super_admin', 'admin'])
@@ -89,14 +171,12 @@ def admin_order_edit(request, order_id):
             order = form.save()
             
             # 记录操作日志
-            OperationLog.objects.create(
+            OperationLog.record(
                 user=request.user,
                 action='edit',
                 object_type='Order',
                 object_id=order.id,
-                object_name=order.order_number,
-                ip_address=request.META.get('REMOTE_ADDR'),
-                description=f'管理员{request.user.username}编辑了订单{order.order_number}'
+                ip_address=request.META.get('REMOTE_ADDR')
             )
             
             messages.success(request, '订单编辑成功')
@@ -116,9 +196,6 @@ def admin_order_detail(request, order_id):
 # 教师订单列表视图
 @login_required
 @role_required(['teacher'])
-@cache_page(60 * 5)  # 缓存5分钟
-@vary_on_cookie
-@vary_on_headers('User-Agent')
 def teacher_order_list(request):
     # 获取筛选参数
     search = request.GET.get('search', '')
@@ -128,19 +205,20 @@ def teacher_order_list(request):
     orders = Order.objects.filter(teacher=request.user)
     
     if search:
-        orders = orders.filter(
-            Q(order_number__icontains=search) |
-            Q(name__icontains=search)
-        )
+        orders = search_orders(orders, search, fields=('order_number', 'name'))
     
     if status:
         orders = orders.filter(status=status)
     
-    # 分页（暂时不实现）
-    orders = orders.order_by('-created_at')
+    # 游标分页：按 (created_at, id) 倒序，不统计总数；缓存按教师区分
+    page = cached_view_data(
+        request, 'teacher_order_list', f'teacher:{request.user.pk}', (Order,),
+        lambda: keyset_paginate(request, orders)
+    )
     
     context = {
-        'orders': orders,
+        'orders': page,
+        'page': page,
         'search': search,
         'status': status,
         'status_choices': Order.STATUS_CHOICES
@@ -175,14 +253,13 @@ def teacher_order_detail(request, order_id):
             order.save()
             
             # 记录操作日志
-            OperationLog.objects.create(
+            OperationLog.record(
                 user=request.user,
                 action='update',
                 object_type='Order',
                 object_id=order.id,
-                object_name=order.order_number,
-                ip_address=request.META.get('REMOTE_ADDR'),
-                description=f'教师{request.user.username}将订单{order.order_number}状态从{dict(Order.STATUS_CHOICES).get(old_status)}更新为{dict(Order.STATUS_CHOICES).get(new_status)}'
+                params={'from': old_status, 'to': new_status},
+                ip_address=request.META.get('REMOTE_ADDR')
             )
             
             messages.success(request, f'订单状态已成功更新为{dict(Order.STATUS_CHOICES).get(new_status)}')
@@ -198,18 +275,14 @@ def teacher_order_detail(request, order_id):
     
     return render(request, 'orders/teacher_order_detail.html', context)
 
-# 工资申请列表视图
-@login_required
-@cache_page(60 * 5)  # 缓存5分钟
-@vary_on_cookie
-@vary_on_headers('User-Agent')
-def salary_application_list(request):
+# 工资申请筛选（列表与导出共用）
+def _filter_salary_applications(request):
     if request.user.is_admin:
         # 管理员查看所有申请
-        applications = SalaryApplication.objects.all()
+        applications = SalaryApplication.objects.select_related('teacher', 'order')
     else:
         # 教师只能查看自己的申请
-        applications = SalaryApplication.objects.filter(teacher=request.user)
+        applications = SalaryApplication.objects.select_related('teacher', 'order').filter(teacher=request.user)
     
     # 获取筛选参数
     status = request.GET.get('status', '')
@@ -217,17 +290,67 @@ def salary_application_list(request):
     if status:
         applications = applications.filter(status=status)
     
-    # 分页（暂时不实现）
-    applications = applications.order_by('-created_at')
+    return applications, status
+
+# 工资申请列表视图
+@login_required
+def salary_application_list(request):
+    applications, status = _filter_salary_applications(request)
+    
+    # 游标分页，只缓存当前页；管理员共享一份缓存，教师各自缓存自己的申请
+    scope = 'admin' if request.user.is_admin else f'teacher:{request.user.pk}'
+    page = cached_view_data(
+        request, 'salary_application_list', scope, (SalaryApplication, Order, User),
+        lambda: keyset_paginate(request, applications)
+    )
+    
+    # 每行单独缓存；行内按钮因角色而异，管理员和教师的片段分开缓存
+    is_admin = request.user.is_admin
+    application_rows = cached_fragments(
+        'salary_application_row:admin' if is_admin else 'salary_application_row:teacher', page.object_list,
+        lambda application: (application.updated_at, application.order.updated_at, application.teacher.username),
+        lambda application: render_to_string('orders/salary_application_row.html', {
+            'application': application, 'is_admin': is_admin, 'is_teacher': request.user.role == 'teacher'
+        })
+    )
     
     context = {
-        'applications': applications,
+        'applications': page,
+        'application_rows': application_rows,
+        'page': page,
         'status': status,
         'status_choices': SalaryApplication.STATUS_CHOICES
     }
     
     return render(request, 'orders/salary_application_list.html', context)
 
+# 导出工资申请视图
+@login_required
+@role_required(['super_admin', 'admin'])
+def salary_application_export(request):
+    """按列表页的筛选条件流式导出工资申请CSV"""
+    applications, status = _filter_salary_applications(request)
+    
+    status_display = dict(SalaryApplication.STATUS_CHOICES)
+    
+    values = applications.order_by('-created_at', '-id').values_list(
+        'application_number', 'teacher__username', 'order__order_number', 'order__name',
+        'apply_amount', 'status', 'created_at', 'approved_at'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    
+    rows = (
+        (application_number, teacher, order_number, order_name, apply_amount,
+         status_display.get(application_status, application_status),
+         timezone.localtime(created_at).strftime('%Y-%m-%d %H:%M'),
+         timezone.localtime(approved_at).strftime('%Y-%m-%d %H:%M') if approved_at else '')
+        for (application_number, teacher, order_number, order_name, apply_amount,
+             application_status, created_at, approved_at) in values
+    )
+    
+    header = ['申请编号', '教师', '订单编号', '订单名称', '申请金额', '审核状态', '申请时间', '审批时间']
+    filename = f'salary_applications_{timezone.localtime().strftime("%Y%m%d_%H%M%S")}.csv'
+    return stream_csv(filename, header, rows)
+
 # 创建工资申请视图
 @login_required
 @role_required(['teacher'])
@@ -242,27 +365,33 @@ def salary_application_create(request):
             application.teacher = request.user  # 设置当前登录教师
             application.status = 'pending'  # 设置初始状态为待审核
             application.apply_amount = form.cleaned_data['apply_amount']
-            application.save()
-            
-            # 记录操作日志
-            OperationLog.objects.create(
-                user=request.user,
-                action='create',
-                object_type='SalaryApplication',
-                object_id=application.id,
-                object_name=f'申请{application.id}',
-                ip_address=request.META.get('REMOTE_ADDR'),
-                description=f'教师{request.user.username}提交了工资申请{application.id}，申请金额：{application.apply_amount}元'
-            )
-            
-            messages.success(request, '工资申请提交成功')
-            return redirect('orders:salary_application_list')
+            try:
+                application.save()
+                # 后台生成证明材料缩略图
+                thumbnails.schedule(application.proof_file.name)
+            except IntegrityError:
+                # 重复提交时由部分唯一约束兜底；引用计数已随事务回滚，清理无人引用的新文件
+                proof_storage.discard(application.proof_file.name)
+                form.add_error('order', '该订单已有待审核或已通过的工资申请')
+            else:
+                # 记录操作日志
+                OperationLog.record(
+                    user=request.user,
+                    action='create',
+                    object_type='SalaryApplication',
+                    object_id=application.id,
+                    params={'amount': str(application.apply_amount)},
+                    ip_address=request.META.get('REMOTE_ADDR')
+                )
+                
+                messages.success(request, '工资申请提交成功')
+                return redirect('orders:salary_application_list')
     else:
         # 创建表单，并根据URL参数预选订单
         form = SalaryApplicationForm(user=request.user, initial={'order': order_id} if order_id else {})
     
     # 获取当前教师的所有工资申请记录（按时间倒序排序，显示最近的10条）
-    existing_applications = SalaryApplication.objects.filter(teacher=request.user).order_by('-created_at')[:10]
+    existing_applications = SalaryApplication.objects.select_related('order').filter(teacher=request.user).order_by('-created_at')[:10]
     
     return render(request, 'orders/salary_application_create.html', {
         'form': form,
@@ -280,6 +409,26 @@ def salary_application_detail(request, application_id):
     
     return render(request, 'orders/salary_application_detail.html', {'application': application})
 
+# 受保护的媒体文件视图
+@login_required
+def protected_media(request, path):
+    """证明材料及其缩略图的下载入口，权限与工资申请详情一致"""
+    try:
+        absolute_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('文件不存在')
+    if not os.path.isfile(absolute_path):
+        raise Http404('文件不存在')
+    
+    # 管理员可以查看所有文件，教师只能查看自己申请中的证明材料
+    # 缩略图按其原文件的名称精确匹配申请
+    if not request.user.is_admin:
+        name = thumbnails.source_name(path) or path
+        if not SalaryApplication.objects.filter(teacher=request.user, proof_file=name).exists():
+            return HttpResponseForbidden('无权访问')
+    
+    return send_file(request, path, absolute_path)
+
 # 审核通过工资申请视图
 @login_required
 @role_required(['super_admin', 'admin'])
@@ -294,14 +443,12 @@ def salary_application_approve(request, application_id):
         application.save()
         
         # 记录操作日志
-        OperationLog.objects.create(
+        OperationLog.record(
             user=request.user,
             action='approve',
             object_type='SalaryApplication',
             object_id=application.id,
-            object_name=f'申请{application.id}',
-            ip_address=request.META.get('REMOTE_ADDR'),
-            description=f'管理员{request.user.username}通过了教师{application.teacher.username}的工资申请{application.id}'
+            ip_address=request.META.get('REMOTE_ADDR')
         )
         
         messages.success(request, '工资申请审核通过')
@@ -323,14 +470,12 @@ def salary_application_reject(request, application_id):
         application.save()
         
         # 记录操作日志
-        OperationLog.objects.create(
+        OperationLog.record(
             user=request.user,
             action='reject',
             object_type='SalaryApplication',
             object_id=application.id,
-            object_name=f'申请{application.id}',
-            ip_address=request.META.get('REMOTE_ADDR'),
-            description=f'管理员{request.user.username}拒绝了教师{application.teacher.username}的工资申请{application.id}'
+            ip_address=request.META.get('REMOTE_ADDR')
         )
         
         messages.success(request, '工资申请已拒绝')
@@ -338,6 +483,78 @@ def salary_application_reject(request, application_id):
     
     return render(request, 'orders/salary_application_reject.html', {'application': application})
 
+# 批量审核工资申请视图
+@login_required
+@role_required(['super_admin', 'admin'])
+@require_POST
+def salary_application_bulk_review(request):
+    """批量通过或拒绝待审核的工资申请"""
+    action = request.POST.get('action')
+    remarks = request.POST.get('remarks', '')
+    application_ids = [int(value) for value in request.POST.getlist('application_ids') if value.isdigit()]
+    
+    if action not in ('approve', 'reject') or not application_ids:
+        messages.error(request, '请选择要审核的申请')
+        return redirect('orders:salary_application_list')
+    
+    now = timezone.now()
+    # update()不会自动更新 updated_at，需显式设置，列表行缓存据此失效
+    if action == 'approve':
+        changes = {'status': 'approved', 'approved_at': now, 'remarks': remarks, 'updated_at': now}
+        verb = '通过'
+    else:
+        changes = {'status': 'rejected', 'rejected_at': now, 'rejection_reason': remarks, 'updated_at': now}
+        verb = '拒绝'
+    
+    with transaction.atomic():
+        # 锁定仍处于待审核状态的申请，用于写入操作日志
+        pending = list(
+            SalaryApplication.objects.select_for_update()
+            .filter(id__in=application_ids, status='pending')
+            .values_list('id', 'teacher_id', 'order_id', 'apply_amount', named=True)
+        )
+        # 条件更新：只修改仍为待审核的记录，已被他人处理的申请不受影响
+        updated = SalaryApplication.objects.filter(
+            id__in=[row.id for row in pending], status='pending'
+        ).update(approved_by=request.user, **changes)
+        
+        # 拒绝后订单可重新申请，同步可申请标记
+        if action == 'reject':
+            Order.refresh_application_flags([row.order_id for row in pending])
+        
+        # update()不触发信号，直接更新仪表盘和教师月度统计
+        DashboardStats.adjust(
+            pending_applications=-updated,
+            approved_amount=sum(row.apply_amount for row in pending) if action == 'approve' else 0
+        )
+        if action == 'approve':
+            month = TeacherMonthlyStats.month_of(now)
+            TeacherMonthlyStats.apply(new=[
+                {(row.teacher_id, month): {'approved_applications': 1, 'approved_amount': row.apply_amount}}
+                for row in pending
+            ])
+        
+        OperationLog.objects.bulk_create([
+            OperationLog(
+                user=request.user,
+                action=action,
+                object_type='SalaryApplication',
+                object_id=row.id,
+                params={'via': 'bulk'},
+                ip_address=request.META.get('REMOTE_ADDR')
+            )
+            for row in pending
+        ])
+        # update()/bulk_create()不触发信号，手动使相关视图缓存失效
+        bump(SalaryApplication, OperationLog, TeacherMonthlyStats)
+    
+    skipped = len(set(application_ids)) - updated
+    if skipped:
+        messages.warning(request, f'已批量{verb}{updated}条申请，{skipped}条不是待审核状态，已跳过')
+    else:
+        messages.success(request, f'已批量{verb}{updated}条申请')
+    return redirect('orders:salary_application_list')
+
 # 撤回工资申请视图
 @login_required
 @role_required(['teacher'])
@@ -354,14 +571,12 @@ def salary_application_withdraw(request, application_id):
         application.save()
         
         # 记录操作日志
-        OperationLog.objects.create(
+        OperationLog.record(
             user=request.user,
             action='withdraw',
             object_type='SalaryApplication',
             object_id=application.id,
-            object_name=f'申请{application.id}',
-            ip_address=request.META.get('REMOTE_ADDR'),
-            description=f'教师{request.user.username}撤回了工资申请{application.id}'
+            ip_address=request.META.get('REMOTE_ADDR')
         )
         
         messages.success(request, '工资申请已撤回')
@@ -372,59 +587,92 @@ def salary_application_withdraw(request, application_id):
 # 日志管理视图
 @login_required
 @role_required(['super_admin', 'admin'])
-@cache_page(60 * 5)  # 缓存5分钟
-@vary_on_cookie
-@vary_on_headers('User-Agent')
 def log_list(request):
     """管理员查看操作日志列表"""
     # 获取筛选参数
     search = request.GET.get('search', '')
     action = request.GET.get('action', '')
-    user_id = request.GET.get('user', '')
+    username = request.GET.get('user', '').strip()
     start_date = request.GET.get('start_date', '')
     end_date = request.GET.get('end_date', '')
     
-    # 构建查询
-    logs = OperationLog.objects.all()
-    
-    if search:
-        logs = logs.filter(
-            Q(description__icontains=search) |
-            Q(object_name__icontains=search) |
-            Q(ip_address__icontains=search)
-        )
-    
-    if action:
-        logs = logs.filter(action=action)
-    
-    if user_id:
-        logs = logs.filter(user_id=user_id)
-    
-    if start_date:
-        logs = logs.filter(created_at__gte=start_date)
-    
-    if end_date:
-        logs = logs.filter(created_at__lte=end_date + ' 23:59:59')
-    
-    # 分页（暂时不实现）
-    logs = logs.order_by('-created_at')
-    
-    # 获取所有用户（用于筛选）
-    users = User.objects.all()
+    # 所有管理员共享同一份查询结果，日志、用户、订单或申请变更后缓存自动失效
+    page, archive_truncated = cached_view_data(
+        request, 'log_list', 'admin', (OperationLog, User, Order, SalaryApplication),
+        lambda: _load_logs(request, search, action, username, _parse_date(start_date), _parse_date(end_date))
+    )
     
     context = {
-        'logs': logs,
+        'logs': page,
+        'page': page,
+        'archived_months': log_archive.archived_months(),
+        'archive_truncated': archive_truncated,
+        'archive_limit': log_archive.ARCHIVE_RESULT_LIMIT,
         'search': search,
         'action': action,
-        'user_id': user_id,
+        'username': username,
         'start_date': start_date,
         'end_date': end_date,
-        'users': users,
         'action_choices': OperationLog.ACTION_CHOICES
     }
     
     return render(request, 'admin/log_list.html', context)
 
+def _load_logs(request, search, action, username, start, end):
+    """按筛选条件查询一页日志，返回 (分页结果, 归档结果是否被截断)"""
+    logs = OperationLog.objects.select_related('user')
+    
+    if search:
+        logs = logs.filter(log_messages.search_filter(search))
+    
+    if action:
+        logs = logs.filter(action=action)
+    
+    # 按用户名筛选：只查询该用户，不再加载全部用户作为下拉选项
+    filter_user = None
+    if username:
+        filter_user = User.objects.filter(username=username).only('id', 'username').first()
+        logs = logs.filter(user=filter_user) if filter_user else logs.none()
+    
+    # 日期解析为当前时区当天0点，结束日期不含次日0点
+    if start:
+        logs = logs.filter(created_at__gte=_day_start(start))
+    if end:
+        logs = logs.filter(created_at__lt=_day_start(end + datetime.timedelta(days=1)))
+    
+    # 日期范围（未设置开始日期视为不限）覆盖已归档月份时，同时查询归档（归档日志都早于数据库中的日志，接在其后分页）
+    archived_months = log_archive.archived_months()
+    archive_result = {}
+    
+    def load_archived():
+        logs, archive_result['truncated'] = log_archive.search_archive(
+            start=_day_start(start) if start else None,
+            end=_day_start(end + datetime.timedelta(days=1)) if end else None,
+            action=action, user_id=filter_user.id if filter_user else '', search=search
+        )
+        return logs
+    
+    older = ()
+    if archived_months and (end is None or end >= archived_months[0]) and not (username and filter_user is None):
+        older = load_archived
+    
+    # 游标分页：按 (created_at, id) 倒序，使用 (created_at)/(user, created_at)/(action, created_at) 索引；
+    # 归档只在翻过数据库中的日志后才读取
+    page = keyset_paginate(request, logs, older=older)
+    
+    # 操作描述在显示时生成，先批量查询关联对象名称
+    OperationLog.prepare_display(page.object_list)
+    return page, archive_result.get('truncated', False)
+
+def _parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        return None
+
+def _day_start(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
 # 数据备份恢复视图
 @login_required
 @role_required(['super_admin', 'admin'])
@@ -472,14 +720,12 @@ def data_backup(request):
                     subprocess.run(cmd, shell=True, check=True)
                 
                 # 记录操作日志
-                OperationLog.objects.create(
+                OperationLog.record(
                     user=request.user,
                     action='create',
                     object_type='Backup',
-                    object_id='0',
-                    object_name=backup_filename,
-                    ip_address=request.META.get('REMOTE_ADDR'),
-                    description=f'管理员{request.user.username}创建了数据备份：{backup_filename}'
+                    params={'file': backup_filename},
+                    ip_address=request.META.get('REMOTE_ADDR')
                 )
                 
                 messages.success(request, '数据备份成功！')
@@ -506,14 +752,12 @@ def data_backup(request):
                     subprocess.run(cmd, shell=True, check=True)
                 
                 # 记录操作日志
-                OperationLog.objects.create(
+                OperationLog.record(
                     user=request.user,
                     action='update',
                     object_type='Database',
-                    object_id='0',
-                    object_name='Database',
-                    ip_address=request.META.get('REMOTE_ADDR'),
-                    description=f'管理员{request.user.username}从备份文件{backup_file.name}恢复了数据'
+                    params={'file': backup_file.name},
+                    ip_address=request.META.get('REMOTE_ADDR')
                 )
                 
                 messages.success(request, '数据恢复成功！')